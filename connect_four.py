@@ -114,6 +114,126 @@ class ConnectFour:
         
         return None
     
+    def column_codes(self):
+        """
+        Return the code of each column: the bits of the stones of player1 from the bottom, under a 1 that marks
+        the height of the column (stones of player1 + mask of the occupied cells + bottom row).
+        """
+        codes = []
+        for j in range(self.columns):
+            column = 0
+            height = 0
+            for i in range(self.rows - 1, -1, -1):
+                cell = self.board[i][j]
+                if cell == " ":
+                    break
+                if cell == self.player1:
+                    column |= 1 << height
+                height += 1
+            codes.append(column | (1 << height))
+        return codes
+
+    def position_key(self, to_play=None, mirrored=False):
+        """
+        Return the key of the position, a unique integer of at most 50 bits (fits in an uint64).
+        Bitboard encoding: each column takes rows + 1 bits with its code (see column_codes);
+        the lowest bit is the player to move.
+        - to_play: player to move in the position (None for self.to_play)
+        - mirrored: return the key of the position reflected left-right
+        """
+        if to_play is None:
+            to_play = self.to_play
+
+        codes = self.column_codes()
+        if mirrored:
+            codes.reverse()
+
+        key = 0
+        height_bits = self.rows + 1
+        for j, column in enumerate(codes):
+            key |= column << (j * height_bits)
+
+        return (key << 1) | (to_play == self.player1)
+
+    def canonical_key(self, to_play=None):
+        """
+        Return the key shared by the position and its left-right reflection (the smaller of the two keys),
+        so that tables keyed by position fold mirrored positions together.
+        Returns (key, mirrored), where mirrored is True if the key is the one of the reflection:
+        the moves stored for the key have then to be mirrored (see mirror_move).
+        - to_play: player to move in the position (None for self.to_play)
+        """
+        key = self.position_key(to_play)
+        mirror_key = self.position_key(to_play, mirrored=True)
+
+        if mirror_key < key:
+            return mirror_key, True
+        return key, False
+
+    def mirror_move(self, column):
+        """Return the column of the move mirrored left-right."""
+        return self.columns - 1 - column
+
+    def is_symmetric(self):
+        """Check if the board is equal to its left-right reflection (e.g. the empty board)."""
+        return all(row == row[::-1] for row in self.board)
+
+    def drop_row(self, column):
+        """Returns the row where a piece played in the column would land, None if the column is full."""
+        for i in range(self.rows - 1, -1, -1):
+            if self.board[i][column] == " ":
+                return i
+        return None
+
+    def is_winning_cell(self, row, column, player):
+        """
+        Check if a piece of the player in the empty cell (row, column) would connect four,
+        counting the pieces of the player on both sides of the cell in each direction.
+        """
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                r, c = row + sign * dr, column + sign * dc
+                while 0 <= r < self.rows and 0 <= c < self.columns and self.board[r][c] == player:
+                    count += 1
+                    r, c = r + sign * dr, c + sign * dc
+            if count >= 4:
+                return True
+        return False
+
+    def winning_cells(self, player):
+        """Returns the set of empty cells (row, column) where a piece of the player would connect four (its threats)."""
+        return {(i, j) for i in range(self.rows) for j in range(self.columns)
+                if self.board[i][j] == " " and self.is_winning_cell(i, j, player)}
+
+    def threat_analysis(self, player=None):
+        """
+        Fast analysis of the immediate threats of the position for the player to move, without searching:
+        - wins: moves that connect four right away
+        - blocks: moves that stop an immediate win of the opponent (more than one: the game is lost)
+        - unsafe: moves that play under a winning cell of the opponent, letting it win on the next move
+        - forced: the moves to consider, if the position forces them (a win, otherwise the blocks), else empty
+        - safe: the available moves which are not unsafe
+        - player: player to move (None for self.to_play)
+        """
+        if player is None:
+            player = self.to_play
+        opponent = self.player1 if player == self.player2 else self.player2
+
+        wins, blocks, unsafe, safe = [], [], [], []
+        for column in self.available_moves():
+            row = self.drop_row(column)
+            if self.is_winning_cell(row, column, player):
+                wins.append(column)
+            if self.is_winning_cell(row, column, opponent):
+                blocks.append(column)
+            if row > 0 and self.is_winning_cell(row - 1, column, opponent):
+                unsafe.append(column)
+            else:
+                safe.append(column)
+
+        return {"wins": wins, "blocks": blocks, "unsafe": unsafe, "safe": safe, "forced": wins[:1] or blocks}
+    
 
     def print_board_with_win(self):
         """
@@ -0,0 +1,87 @@
+import os
+import numpy as np
+
+
+class FitnessHistory:
+    """
+    Best fitness of each generation of a run, stored in a compact numpy buffer instead of a python list.
+    With a path, the values are streamed to a raw binary file (one int64 per generation) every chunk_size
+    generations, so that only the last chunk is kept in memory; the file can be read back with np.fromfile.
+    """
+
+    def __init__(self, path=None, chunk_size=4096):
+        """
+        - path: path of the binary file of the history (None to keep the whole history in memory),
+                an existing file is overwritten
+        - chunk_size: number of values kept in memory before writing them to the file
+                      (without a path, initial size of the buffer, which doubles when full)
+        """
+        self.path = path
+        self.buffer = np.empty(chunk_size, dtype=np.int64)
+        self.size = 0          # values in the buffer
+        self.flushed = 0       # values already written to the file
+        self.array = None      # whole history as an array, cached for indexing until the next append
+
+        if self.path is not None:
+            open(self.path, "wb").close()
+
+
+    def append(self, fitness):
+        """Record the best fitness of the next generation."""
+        if self.size == len(self.buffer):
+            if self.path is not None:
+                self.flush()
+            else:
+                self.buffer = np.resize(self.buffer, 2 * len(self.buffer))
+
+        self.buffer[self.size] = fitness
+        self.size += 1
+        self.array = None
+
+
+    def flush(self):
+        """Write the values in memory to the file (only with a path)."""
+        if self.path is None or self.size == 0:
+            return
+
+        with open(self.path, "ab") as f:
+            self.buffer[:self.size].tofile(f)
+
+        self.flushed += self.size
+        self.size = 0
+
+
+    def to_array(self):
+        """Return the whole history as a numpy array (read back from the file, with a path)."""
+        if self.path is None:
+            return self.buffer[:self.size].copy()
+
+        self.flush()
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=np.int64)
+        return np.fromfile(self.path, dtype=np.int64)
+
+
+    def tolist(self):
+        """Return the whole history as a list of python ints."""
+        return self.to_array().tolist()
+
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.to_array()
+        return array if dtype is None else array.astype(dtype)
+
+
+    def __len__(self):
+        return self.flushed + self.size
+
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+
+    def __getitem__(self, index):
+        # the history is read back (from the file, with a path) once, not at each index
+        if self.array is None:
+            self.array = self.to_array()
+        return self.array[index]
@@ -1,13 +1,28 @@
+import math
+import operator
 import random
-import matplotlib.pyplot as plt
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
 import numpy as np
+from fitness_history import FitnessHistory
+from knapsack_instance import DEFAULT_CONSTANTS, default_constants
 
 class GeneticAlgorithm:
 
-    def __init__(self, items, capacity, population_size, mutation_rate, selection_method, crossover_rate, tournament_k=None):
+    def __init__(self, items, capacity, population_size, mutation_rate, selection_method, crossover_rate, tournament_k=None,
+                 representation="list", fitness_cache_size=None, incremental_fitness=False, seed=None,
+                 repair=False, initialization="random", generation_gap=1.0, history_path=None, weights=None, values=None):
         
-        # knapsack problem data
-        self.items = items
+        # knapsack problem data: the list of items (weight, value), or the arrays of the weights and of the values
+        # (possibly memory-mapped, see from_instance); the list is built from the arrays only if a list path needs it
+        if items is None and (weights is None or values is None):
+            raise ValueError("Either the items or the weights and the values are needed")
+
+        self._items = items
+        self.item_arrays = (weights, values) if items is None else None
+        self.n_items = len(items) if items is not None else len(weights)
         self.capacity = capacity
 
         # hyper parameters of the genetic algorithm
@@ -17,10 +32,134 @@ class GeneticAlgorithm:
         self.crossover_rate = crossover_rate
         self.tournament_k = tournament_k
 
+        # representation of the population:
+        # - "list": list of individuals, each one a list of genes (0/1)
+        # - "numpy": (population_size, n_items) uint8 matrix, with operators applied to the whole population at once
+        # - "bitset": list of individuals, each one packed in a python int where the bit i is the gene i
+        self.representation = representation
+
+        if self.representation == "numpy":
+            if items is None:
+                self.weights = np.asarray(weights, dtype=np.int64)
+                self.values = np.asarray(values, dtype=np.int64)
+            else:
+                self.weights = np.array([weight for weight, _ in items], dtype=np.int64)
+                self.values = np.array([value for _, value in items], dtype=np.int64)
+            # (n_items, 2) matrix with weights and values, to compute both the totals with a single product 
+            self.item_matrix = np.stack((self.weights, self.values), axis=1).astype(np.float64)
+
+        # random generators of the run, seeded for reproducible runs (None for a random seed)
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)  # used by the numpy representation and by the batched tournament
+
+        if self.representation == "bitset":
+            self.build_lookup_tables()
+
+        # optional LRU cache of the fitness, with at most fitness_cache_size chromosomes (list and bitset representations)
+        if fitness_cache_size is not None and self.representation == "numpy":
+            raise ValueError("The fitness cache is not available with the numpy representation")
+
+        self.fitness_cache_size = fitness_cache_size
+        self.fitness_cache = OrderedDict() if fitness_cache_size is not None else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # incremental fitness (list representation): each individual carries its total weight and value,
+        # updated by crossover and mutation only for the genes that change
+        if incremental_fitness and self.representation != "list":
+            raise ValueError("The incremental fitness is available only with the list representation")
+
+        # with the incremental fitness the fitness is computed from the totals, so the cache would never be looked up
+        # (and its hit rate would always read 0)
+        if incremental_fitness and fitness_cache_size is not None:
+            raise ValueError("The fitness cache is not used with the incremental fitness: set only one of the two")
+
+        self.incremental_fitness = incremental_fitness
+        self._item_weights = None  # weights and values of the items as lists, built on first use (see item_weights)
+        self._item_values = None
+        self.totals = []  # (total weight, total value) of each individual of the population
+        self.prefix_sums = {}  # prefix sums of the weights and values of the parents of the current generation
+
+        # repair operator (overweight individuals drop their worst items, then greedily fill the leftover capacity)
+        # and initialization ("random" or "greedy", seeded from randomized greedy solutions),
+        # both based on the items sorted by decreasing V/W ratio
+        self.repair = repair
+        self.initialization = initialization
+        self._ratio_order = None  # built on first use (see ratio_order)
+        item_weights = weights if items is None else [weight for weight, _ in items]
+        self.min_weight = int(np.min(item_weights)) if self.n_items > 0 else 0
+
+        # fraction of the population replaced at each generation: with 1.0 every generation builds a new population
+        # (generational GA), with smaller values the GA runs in steady-state mode, where each generation writes
+        # its few offsprings in place of the worst individuals of the population, without reallocating it
+        if not 0 < generation_gap <= 1:
+            raise ValueError("The generation gap must be in (0, 1]")
+
+        self.generation_gap = generation_gap
+
         self.population = []
         self.fitness_scores = []
         self.best_solution = 0
-        self.history = []
+
+        # state of the current run, so that it can be evolved a few generations at a time
+        # (the fitness history is streamed to history_path, if given, see FitnessHistory)
+        self.history_path = history_path
+        self.generation = 0
+        self.fitness_history = FitnessHistory()
+        self.best_global_fitness = -1
+        self.best_global_solution = None
+        self.best_global_totals = None
+        self.last_improvement = 0  # number of generations performed when the best solution last improved
+        self.stop_reason = None  # reason why the last call of evolve stopped
+
+
+    @classmethod
+    def from_instance(cls, instance, **kwargs):
+        """
+        Build the genetic algorithm for a knapsack instance (see knapsack_instance.KnapsackInstance),
+        from its arrays: with the numpy representation they are used as they are, without building the list of items.
+        - kwargs: hyper-parameters of the genetic algorithm (population_size, mutation_rate, ...)
+        """
+        return cls(None, instance.capacity, weights=instance.weights, values=instance.values, **kwargs)
+
+
+    @property
+    def items(self):
+        """List of items, where each item is (weight, value), built from the arrays on first access if not given."""
+        if self._items is None:
+            weights, values = self.item_arrays
+            self._items = list(zip(np.asarray(weights).tolist(), np.asarray(values).tolist()))
+        return self._items
+
+
+    @property
+    def item_weights(self):
+        """Weights of the items as a list, for the list and bitset representations."""
+        if self._item_weights is None:
+            self._item_weights = [weight for weight, _ in self.items] if self.item_arrays is None else \
+                                 np.asarray(self.item_arrays[0]).tolist()
+        return self._item_weights
+
+
+    @property
+    def item_values(self):
+        """Values of the items as a list, for the list and bitset representations."""
+        if self._item_values is None:
+            self._item_values = [value for _, value in self.items] if self.item_arrays is None else \
+                                np.asarray(self.item_arrays[1]).tolist()
+        return self._item_values
+
+
+    @property
+    def ratio_order(self):
+        """Indices of the items sorted by decreasing V/W ratio (items without weight first), used by repair and greedy init."""
+        if self._ratio_order is None:
+            weights = np.asarray(self.item_arrays[0] if self.item_arrays is not None else self.item_weights, dtype=np.int64)
+            values = np.asarray(self.item_arrays[1] if self.item_arrays is not None else self.item_values, dtype=np.int64)
+            ratios = np.full(len(weights), np.inf)
+            np.divide(values, weights, out=ratios, where=weights > 0)
+            self._ratio_order = np.argsort(-ratios, kind="stable").tolist()
+        return self._ratio_order
 
 
     def inizialize_population(self):
@@ -28,8 +167,21 @@ class GeneticAlgorithm:
         self.population = []
         PROB_TO_TAKE = 0.015   # probability of a gene of the individual to be 1
 
+        if self.initialization == "greedy":
+            for _ in range(self.population_size):
+                if self.representation == "bitset":
+                    self.population.append(self.positions_to_bitset(self.randomized_greedy_positions()))
+                else:
+                    self.population.append(self.randomized_greedy_genes())
+            return
+
+        if self.representation == "bitset":
+            for _ in range(self.population_size):
+                self.population.append(self.positions_to_bitset(self.sample_positions(PROB_TO_TAKE)))
+            return
+
         for _ in range(self.population_size):
-            individual = [1 if random.random() < PROB_TO_TAKE else 0 for _ in range(len(self.items))]
+            individual = [1 if self.random.random() < PROB_TO_TAKE else 0 for _ in range(self.n_items)]
             self.population.append(individual)
 
 
@@ -38,6 +190,9 @@ class GeneticAlgorithm:
         Calculate the fitness of a given individual as the sum of the value of the corresponding items picked.
         If the fitness exceeds the knapsack capacity the fitness is set to 0 so that the individual gets discarded.
         """
+        if self.representation == "bitset":
+            return self.calculate_fitness_bitset(individual)
+
         total_value = 0
         total_weight = 0
 
@@ -52,54 +207,86 @@ class GeneticAlgorithm:
         return total_value
 
 
-    def parent_selection_roulette(self):
+    def cached_fitness(self, individual):
         """
-        Perform a Roulette Selection, returning the elected individual, which will be a parent.
+        Return the fitness of the given individual, looking it up in the LRU fitness cache (if enabled)
+        before calling calculate_fitness. The cache is keyed by the chromosome packed in bytes (or by the int
+        itself for the bitset representation) and evicts the least recently used entry when full.
         """
+        if self.fitness_cache is None:
+            return self.calculate_fitness(individual)
+
+        key = individual if self.representation == "bitset" else bytes(individual)
+
+        fitness = self.fitness_cache.get(key)
+        if fitness is not None:
+            self.cache_hits += 1
+            self.fitness_cache.move_to_end(key)  # mark as most recently used
+            return fitness
+
+        self.cache_misses += 1
+        fitness = self.calculate_fitness(individual)
+
+        self.fitness_cache[key] = fitness
+        if len(self.fitness_cache) > self.fitness_cache_size:
+            self.fitness_cache.popitem(last=False)  # evict the least recently used
 
-        total_fitness_sum = sum(self.fitness_scores)
+        return fitness
+
+
+    def parent_indices_roulette(self, num_parents):
+        """
+        Perform num_parents Roulette Selections at once, returning the indices of the elected individuals.
+        The cumulative fitness is built once, then each pick is located with a binary search.
+        - num_parents: number of parents to select
+        """
 
-        # if the total fitness of the population is 0 just return a random individual
+        cumulative_fitness = list(accumulate(self.fitness_scores))
+        total_fitness_sum = cumulative_fitness[-1]
+        last = len(self.population) - 1
+
+        # if the total fitness of the population is 0 just return random individuals
         if total_fitness_sum == 0:
-            return self.population[random.randint(0, len(self.population) - 1)]
-        
-        pick = random.uniform(0, total_fitness_sum) 
-        current_sum = 0
+            return [self.random.randint(0, last) for _ in range(num_parents)]
 
-        for i in range(len(self.population)):
-            current_sum += self.fitness_scores[i]
-            if current_sum > pick:
-                return self.population[i]
-            
-        # fallback
-        return self.population[-1]
+        # first individual whose cumulative fitness exceeds the pick (the last one as fallback)
+        return [min(bisect_right(cumulative_fitness, self.random.uniform(0, total_fitness_sum)), last) 
+                for _ in range(num_parents)]
 
 
-    def parent_selection_tournament(self):
+    def parent_indices_tournament(self, num_parents):
         """
-        Perform a Tournament Selection, returning the elected individual, which will be a parent.
+        Perform num_parents Tournament Selections at once, returning the indices of the elected individuals.
+        A single numpy call draws a row of k random competitors for each parent, then the winner of each row 
+        is the one with the best fitness.
+        - num_parents: number of parents to select
         """
+        competitors = self.rng.integers(0, len(self.population), (num_parents, self.tournament_k))
+        winners = np.argmax(np.asarray(self.fitness_scores)[competitors], axis=1)
 
-        # select randomly the k individual which will compete in the tournament
-        tournament_indices = random.sample(range(len(self.population)), self.tournament_k)
+        return competitors[np.arange(num_parents), winners]
 
-        best_idx = -1
-        best_fit = -1
-        
-        # find the individual with the best fitness
-        for idx in tournament_indices:
-            if self.fitness_scores[idx] > best_fit:
-                best_fit = self.fitness_scores[idx]
-                best_idx = idx
 
-        return self.population[best_idx]
+    def parent_indices(self, num_parents):
+        """
+        Select all the parents of a generation with the selection method of the configuration,
+        returning their indices in the population.
+        - num_parents: number of parents to select
+        """
+        if self.selection_method == "Roulette":
+            return self.parent_indices_roulette(num_parents)
+        return self.parent_indices_tournament(num_parents).tolist()
 
     def crossover(self, parent_one, parent_two):
         """
         Perform the crossover operation. Given the two parents, perform a 1-point random crossover 
         and return the two offsprings.
         """
-        k = random.randint(0, len(self.items) - 2)
+        k = self.random.randint(0, self.n_items - 2)
+
+        if self.representation == "bitset":
+            return self.crossover_bitset(parent_one, parent_two, k)
+
         offspring_one = parent_one[0:k] + parent_two[k:]
         offspring_two = parent_two[0:k] + parent_one[k:]
         return (offspring_one, offspring_two)
@@ -110,225 +297,813 @@ class GeneticAlgorithm:
         Perform the mutation of the given individual. Each gene of the individual has a probability to switch.
         """
 
+        if self.representation == "bitset":
+            return self.mutation_bitset(individual)
+
         new_ind = individual[:] 
 
         for i in range(len(new_ind)):
-            if random.random() < self.mutation_rate:
+            if self.random.random() < self.mutation_rate:
                 new_ind[i] = 1 - new_ind[i]
 
         return new_ind
 
 
-    def run_experiment_config(self, max_generation, plot=False):
+    def calculate_totals(self, individual):
+        """Return the total weight and the total value of the items picked by the given individual."""
+        return (sum(map(operator.mul, individual, self.item_weights)),
+                sum(map(operator.mul, individual, self.item_values)))
+
+
+    def parent_prefix_sums(self, idx):
         """
-        Perform the genetic algorithm.
+        Return the prefix sums of the weights and values of the items picked by the parent in position idx,
+        computed once per generation: prefix[k] is the total of the first k genes.
         """
+        if idx not in self.prefix_sums:
+            individual = self.population[idx]
+            self.prefix_sums[idx] = (list(accumulate(map(operator.mul, individual, self.item_weights), initial=0)),
+                                     list(accumulate(map(operator.mul, individual, self.item_values), initial=0)))
+        return self.prefix_sums[idx]
 
-        # 1) initialize population 
-        self.inizialize_population()
 
-        # 2) compute the fitness of the population
-        self.fitness_scores = [self.calculate_fitness(individual) for individual in self.population]
-        best_global_fitness = max(self.fitness_scores)
-        best_idx = self.fitness_scores.index(best_global_fitness)
-        best_global_solution = self.population[best_idx][:]
+    def crossover_incremental(self, idx_one, idx_two):
+        """
+        Perform the 1-point random crossover of the parents in position idx_one and idx_two, returning the 
+        two offsprings with their totals, derived from the totals and the prefix sums of the parents.
+        """
+        k = self.random.randint(0, self.n_items - 2)
 
-        fitness_history = []
+        parent_one, parent_two = self.population[idx_one], self.population[idx_two]
+        (weight_one, value_one), (weight_two, value_two) = self.totals[idx_one], self.totals[idx_two]
+        prefix_weights_one, prefix_values_one = self.parent_prefix_sums(idx_one)
+        prefix_weights_two, prefix_values_two = self.parent_prefix_sums(idx_two)
 
-        # until reaching the max generation
-        for generation in range(max_generation):
+        # each offspring takes the first k genes from a parent and the others from the second one
+        offspring_one = parent_one[0:k] + parent_two[k:]
+        totals_one = (prefix_weights_one[k] + weight_two - prefix_weights_two[k],
+                      prefix_values_one[k] + value_two - prefix_values_two[k])
 
-            fitness_history.append(best_global_fitness)
+        offspring_two = parent_two[0:k] + parent_one[k:]
+        totals_two = (prefix_weights_two[k] + weight_one - prefix_weights_one[k],
+                      prefix_values_two[k] + value_one - prefix_values_one[k])
 
-            new_population = []
+        return (offspring_one, totals_one), (offspring_two, totals_two)
 
-            # elitism: copy the best individual of the previous generartion directly in to the new one
-            new_population.append(best_global_solution[:]) 
 
-            # untill fully filling the new population
-            while len(new_population) < self.population_size:
+    def mutation_incremental(self, individual, totals):
+        """
+        Perform the mutation of the given individual, drawing directly the genes to switch with sample_positions
+        and updating its totals only for them.
+        - totals: total weight and value of the individual
+        """
+        positions = self.sample_positions(self.mutation_rate)
+        if not positions:
+            return individual, totals
 
-                # 3) select 2 parents
-                if self.selection_method == "Roulette":
-                    p1 = self.parent_selection_roulette()
-                    p2 = self.parent_selection_roulette()
-                else: 
-                    p1 = self.parent_selection_tournament()
-                    p2 = self.parent_selection_tournament()
+        new_ind = individual[:]
+        total_weight, total_value = totals
 
-                # 4) crossover to generate the offsprings
-                if random.random() < self.crossover_rate:
-                    o1, o2 = self.crossover(p1, p2)
-                else:
-                    o1, o2 = p1.copy(), p2.copy()
+        for i in positions:
+            if new_ind[i] == 1:
+                total_weight -= self.item_weights[i]
+                total_value -= self.item_values[i]
+            else:
+                total_weight += self.item_weights[i]
+                total_value += self.item_values[i]
+            new_ind[i] = 1 - new_ind[i]
 
-                # 5) mutation of the offsprings
-                o1 = self.mutation(o1)
-                o2 = self.mutation(o2)
+        return new_ind, (total_weight, total_value)
 
-                new_population.append(o1)
-                if len(new_population) < self.population_size:
-                    new_population.append(o2)
-        
-            self.population = new_population[:self.population_size]
-        
-            self.fitness_scores = [self.calculate_fitness(individual) for individual in self.population]
+
+    def repair_genes(self, genes, total_weight, total_value):
+        """
+        Repair operator: if the individual exceeds the knapsack capacity, drop its picked items starting from
+        the worst V/W ratio until it is feasible, then greedily pick the best-ratio items that still fit.
+        Returns a repaired copy of the genes, with its total weight and value.
+        - genes: list of genes (0/1) of the individual
+        - total_weight, total_value: totals of the individual
+        """
+        genes = genes[:]
+
+        # drop the worst items until the individual is feasible
+        if total_weight > self.capacity:
+            for i in reversed(self.ratio_order):
+                if genes[i] == 1:
+                    genes[i] = 0
+                    total_weight -= self.item_weights[i]
+                    total_value -= self.item_values[i]
+                    if total_weight <= self.capacity:
+                        break
+
+        # greedily fill the leftover capacity, while the lightest item can still fit
+        if self.capacity - total_weight >= self.min_weight:
+            for i in self.ratio_order:
+                if genes[i] == 0 and total_weight + self.item_weights[i] <= self.capacity:
+                    genes[i] = 1
+                    total_weight += self.item_weights[i]
+                    total_value += self.item_values[i]
+                    if self.capacity - total_weight < self.min_weight:
+                        break
+
+        return genes, total_weight, total_value
+
+
+    def repair_individual(self, individual):
+        """Return the repaired copy of an individual of the list or bitset representation (see repair_genes)."""
+        if self.representation == "bitset":
+            return self.repair_bitset(individual)
+
+        genes = self.individual_to_list(individual)
+        total_weight, total_value = self.calculate_totals(genes)
+
+        genes, _, _ = self.repair_genes(genes, total_weight, total_value)
+        return self.list_to_individual(genes)
+
+
+    def repair_incremental(self, individual, totals):
+        """Return the repaired copy of an individual with its updated totals (see repair_genes)."""
+        genes, total_weight, total_value = self.repair_genes(individual, *totals)
+        return genes, (total_weight, total_value)
+
+
+    def randomized_greedy_genes(self):
+        """Return the genes of a randomized greedy solution (see randomized_greedy_positions)."""
+        genes = [0] * self.n_items
+        for i in self.randomized_greedy_positions():
+            genes[i] = 1
+        return genes
+
+
+    def randomized_greedy_positions(self):
+        """
+        Return the positions of the items of a randomized greedy solution: the items are picked in order of V/W ratio
+        perturbed by a random noise, as long as they fit in the knapsack.
+        """
+        GREEDY_NOISE = 0.5   # each ratio is multiplied by a random factor in [1 - noise, 1 + noise]
+
+        n_items = self.n_items
+        noisy_ratios = [self.item_values[i] / self.item_weights[i] if self.item_weights[i] > 0 else float("inf")
+                        for i in range(n_items)]
+        noisy_ratios = [ratio * self.random.uniform(1 - GREEDY_NOISE, 1 + GREEDY_NOISE) for ratio in noisy_ratios]
+
+        positions = []
+        total_weight = 0
+
+        for i in sorted(range(n_items), key=lambda i: noisy_ratios[i], reverse=True):
+            if total_weight + self.item_weights[i] <= self.capacity:
+                positions.append(i)
+                total_weight += self.item_weights[i]
+
+        return positions
+
+
+    def evaluate_population(self):
+        """
+        Compute the fitness of the whole population: from the totals carried by each individual with the
+        incremental fitness, otherwise with calculate_fitness (through the cache, if enabled).
+        """
+        if self.incremental_fitness:
+            self.fitness_scores = [value if weight <= self.capacity else 0 for weight, value in self.totals]
+        else:
+            self.fitness_scores = [self.cached_fitness(individual) for individual in self.population]
+
+
+    def start_run(self):
+        """
+        Start a new run: initialize the population and compute its fitness, resetting the best solution and the history.
+        """
+        self.generation = 0
+        self.fitness_history = FitnessHistory(self.history_path)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # 1) initialize population 
+        # 2) compute the fitness of the population
+        if self.representation == "numpy":
+            self.inizialize_population_matrix()
+            if self.repair:
+                self.population = self.repair_matrix(self.population)
+            self.fitness_scores = self.calculate_fitness_matrix(self.population)
+        else:
+            self.inizialize_population()
+            if self.repair:
+                self.population = [self.repair_individual(individual) for individual in self.population]
+            if self.incremental_fitness:
+                self.totals = [self.calculate_totals(individual) for individual in self.population]
+            self.evaluate_population()
+
+        self.best_global_fitness = -1
+        self.update_best_solution()
+        self.stop_reason = None
+
+
+    def update_best_solution(self):
+        """Update the best solution found so far with the best individual of the current population."""
+
+        if self.representation == "numpy":
+            best_idx = int(np.argmax(self.fitness_scores))
+            current_best = int(self.fitness_scores[best_idx])
+        else:
             current_best = max(self.fitness_scores)
+            best_idx = self.fitness_scores.index(current_best)
 
-            # update the best solution found so far
-            if current_best > best_global_fitness:
-                best_global_fitness = current_best
-                best_idx = self.fitness_scores.index(current_best)
-                best_global_solution = self.population[best_idx][:]
-                self.best_solution = best_global_solution[:]
+        if current_best > self.best_global_fitness:
+            self.best_global_fitness = current_best
+            self.last_improvement = self.generation
+            if self.representation == "numpy":
+                self.best_global_solution = self.population[best_idx].copy()
+            else:
+                self.best_global_solution = self.population[best_idx]
+            self.best_global_totals = self.totals[best_idx] if self.incremental_fitness else None
 
-        self.best_solution = best_global_solution[:]
 
-        if plot:
-            self.plot_single_run(fitness_history)
+    def breed(self, i1, i2):
+        """
+        Generate two offsprings from the parents of index i1 and i2 (list and bitset representations), 
+        with crossover, mutation and, if enabled, repair.
+        Returns the two offsprings, each one with its totals (None without the incremental fitness).
+        """
+        p1, p2 = self.population[i1], self.population[i2]
 
-        return fitness_history, best_global_fitness
-    
-    
-    def plot_single_run(self, fitness_history):
+        if self.incremental_fitness:
+
+            # 4-5) crossover and mutation, updating the totals carried by the offsprings
+            if self.random.random() < self.crossover_rate:
+                (o1, t1), (o2, t2) = self.crossover_incremental(i1, i2)
+            else:
+                (o1, t1), (o2, t2) = (p1, self.totals[i1]), (p2, self.totals[i2])
+
+            o1, t1 = self.mutation_incremental(o1, t1)
+            o2, t2 = self.mutation_incremental(o2, t2)
+
+            if self.repair:
+                o1, t1 = self.repair_incremental(o1, t1)
+                o2, t2 = self.repair_incremental(o2, t2)
+
+            return (o1, t1), (o2, t2)
+
+        # 4) crossover to generate the offsprings
+        if self.random.random() < self.crossover_rate:
+            o1, o2 = self.crossover(p1, p2)
+        else:
+            o1, o2 = p1, p2
+
+        # 5) mutation of the offsprings
+        o1 = self.mutation(o1)
+        o2 = self.mutation(o2)
+
+        if self.repair:
+            o1 = self.repair_individual(o1)
+            o2 = self.repair_individual(o2)
+
+        return (o1, None), (o2, None)
+
+
+    def next_generation(self):
         """
-        Plot the fitness history of the genetic algorithm through the generations.
+        Replace the population with the next generation and compute its fitness (list and bitset representations).
         """
-        gens = np.arange(len(fitness_history))
-    
-        plt.figure(figsize=(10,6))
-        plt.plot(gens, fitness_history, label='Fitness for generation', linewidth=2)
-    
-        plt.title("Fitness Convergence")
-        plt.xlabel("Generation")
-        plt.ylabel("Fitness")
-        plt.grid(True)
-        plt.legend()
-        plt.show()
 
+        new_population = []
 
-# knapsack problem instance
-ITEMS = [(485, 585), (94, 194), (326, 426), (506, 606), (248, 348), (416, 516), (421, 521), (992, 1092), (322, 422), (649, 749), (795, 895), (237, 337), (43, 143), (457, 557), (845, 945), (815, 915), (955, 1055), (446, 546), (252, 352), (422, 522), (9, 109), (791, 891), (901, 1001), (359, 459), (122, 222), (667, 767), (94, 194), (598, 698), (738, 838), (7, 107), (574, 674), (544, 644), (715, 815), (334, 434), (882, 982), (766, 866), (367, 467), (994, 1094), (984, 1084), (893, 993), (299, 399), (633, 733), (433, 533), (131, 231), (682, 782), (428, 528), (72, 172), (700, 800), (874, 974), (617, 717), (138, 238), (874, 974), (856, 956), (720, 820), (145, 245), (419, 519), (995, 1095), (794, 894), (529, 629), (196, 296), (199, 299), (997, 1097), (277, 377), (116, 216), (97, 197), (908, 1008), (719, 819), (539, 639), (242, 342), (707, 807), (107, 207), (569, 669), (122, 222), (537, 637), (70, 170), (931, 1031), (98, 198), (726, 826), (600, 700), (487, 587), (645, 745), (772, 872), (267, 367), (513, 613), (972, 1072), (81, 181), (895, 995), (943, 1043), (213, 313), (58, 158), (748, 848), (303, 403), (487, 587), (764, 864), (923, 1023), (536, 636), (29, 129), (724, 824), (674, 774), (789, 889), (540, 640), (479, 579), (554, 654), (142, 242), (467, 567), (339, 439), (46, 146), (641, 741), (710, 810), (196, 296), (553, 653), (494, 594), (191, 291), (66, 166), (724, 824), (824, 924), (730, 830), (208, 308), (988, 1088), (711, 811), (90, 190), (800, 900), (340, 440), (314, 414), (549, 649), (289, 389), (196, 296), (401, 501), (865, 965), (466, 566), (678, 778), (689, 789), (570, 670), (833, 933), (936, 1036), (225, 325), (722, 822), (244, 344), (651, 751), (849, 949), (123, 223), (113, 213), (431, 531), (379, 479), (508, 608), (361, 461), (585, 685), (65, 165), (853, 953), (486, 586), (642, 742), (686, 786), (992, 1092), (286, 386), (725, 825), (889, 989), (286, 386), (24, 124), (812, 912), (491, 591), (859, 959), (891, 991), (663, 763), (90, 190), (88, 188), (181, 281), (179, 279), (214, 314), (187, 287), (17, 117), (619, 719), (472, 572), (261, 361), (418, 518), (846, 946), (419, 519), (192, 292), (356, 456), (261, 361), (682, 782), (514, 614), (306, 406), (886, 986), (201, 301), (530, 630), (385, 485), (849, 949), (952, 1052), (294, 394), (500, 600), (799, 899), (194, 294), (391, 491), (737, 837), (330, 430), (324, 424), (298, 398), (992, 1092), (790, 890), (224, 324), (275, 375), (260, 360), (826, 926), (97, 197), (72, 172), (210, 310), (866, 966), (649, 749), (951, 1051), (919, 1019), (748, 848), (63, 163), (685, 785), (958, 1058), (956, 1056), (804, 904), (564, 664), (518, 618), (183, 283), (428, 528), (400, 500), (537, 637), (721, 821), (346, 446), (207, 307), (153, 253), (323, 423), (971, 1071), (611, 711), (662, 762), (116, 216), (197, 297), (109, 209), (91, 191), (795, 895), (529, 629), (343, 443), (126, 226), (862, 962), (747, 847), (685, 785), (469, 569), (10, 110), (770, 870), (881, 981), (934, 1034), (984, 1084), (723, 823), (403, 503), (895, 995), (360, 460), (568, 668), (449, 549), (172, 272), (541, 641), (958, 1058), (272, 372), (383, 483), (877, 977), (308, 408), (359, 459), (970, 1070), (707, 807), (583, 683), (308, 408), (48, 148), (770, 870), (930, 1030), (30, 130), (569, 669), (208, 308), (3, 103), (311, 411), (20, 120), (100, 200), (609, 709), (939, 1039), (887, 987), (422, 522), (825, 925), (785, 885), (930, 1030), (370, 470), (904, 1004), (989, 1089), (241, 341), (969, 1069), (379, 479), (143, 243), (376, 476), (972, 1072), (962, 1062), (28, 128), (889, 989), (61, 161), (443, 543), (638, 738), (216, 316), (348, 448), (338, 438), (347, 447), (160, 260), (66, 166), (406, 506), (391, 491), (159, 259), (638, 738), (31, 131), (295, 395), (204, 304), (826, 926), (420, 520), (196, 296), (153, 253), (449, 549), (425, 525), (855, 955), (331, 431), (143, 243), (565, 665), (487, 587), (838, 938), (140, 240), (9, 109), (564, 664), (918, 1018), (615, 715), (533, 633), (135, 235), (232, 332), (564, 664), (957, 1057), (360, 460), (591, 691), (793, 893), (576, 676), (163, 263), (746, 846), (859, 959), (377, 477), (760, 860), (858, 958), (711, 811), (86, 186), (662, 762), (434, 534), (159, 259), (558, 658), (660, 760), (279, 379), (268, 368), (840, 940), (948, 1048), (735, 835), (315, 415), (574, 674), (676, 776), (126, 226), (341, 441), (912, 1012), (689, 789), (739, 839), (894, 994), (821, 921), (706, 806), (625, 725), (490, 590), (917, 1017), (478, 578), (201, 301), (671, 771), (993, 1093), (932, 1032), (149, 249), (899, 999), (52, 152), (237, 337), (759, 859), (187, 287), (267, 367), (472, 572), (256, 356), (772, 872), (783, 883), (98, 198), (117, 217), (906, 1006), (516, 616), (911, 1011), (180, 280), (635, 735), (25, 125), (225, 325), (380, 480), (823, 923), (712, 812), (164, 264), (266, 366), (343, 443), (216, 316), (732, 832), (448, 548), (502, 602), (541, 641), (740, 840), (664, 764), (576, 676), (954, 1054), (612, 712), (726, 826), (902, 1002), (772, 872), (454, 554), (531, 631), (411, 511), (943, 1043), (973, 1073), (750, 850), (703, 803), (327, 427), (850, 950), (917, 1017), (77, 177), (5, 105), (220, 320), (113, 213), (802, 902), (913, 1013), (403, 503), (791, 891), (181, 281), (998, 1098), (10, 110), (859, 959), (525, 625), (345, 445), (919, 1019), (431, 531), (668, 768), (675, 775), (527, 627), (833, 933), (462, 562), (438, 538), (291, 391), (523, 623), (605, 705), (916, 1016), (457, 557), (420, 520), (405, 505), (115, 215), (417, 517), (660, 760), (279, 379), (261, 361), (685, 785), (772, 872), (596, 696), (388, 488), (307, 407), (764, 864), (224, 324), (843, 943), (322, 422), (206, 306), (840, 940), (407, 507), (975, 1075), (639, 739), (401, 501), (852, 952), (91, 191), (542, 642), (327, 427), (60, 160), (330, 430), (757, 857), (182, 282), (82, 182), (603, 703), (637, 737), (793, 893), (93, 193), (615, 715), (614, 714), (733, 833), (136, 236), (864, 964), (187, 287), (16, 116), (102, 202), (863, 963), (972, 1072), (987, 1087), (163, 263), (306, 406), (501, 601), (34, 134), (477, 577)]
-KNAPSACK_CAPACITY = 2517
-OPTIMAL_FITNESS = 7117
-NUM_ITEMS = 500
+        # elitism: copy the best individual of the previous generartion directly in to the new one
+        # (individuals are never modified in place: crossover and mutation always build new ones)
+        new_population.append(self.best_global_solution) 
+        new_totals = [self.best_global_totals]
 
-if __name__ == "__main__":
+        self.prefix_sums = {}
 
-    print(f"======== Starting Grid Search (Pop, Mut, Sel, Cross, Tourn_K) ========")
-    
-    # perform a grid search to find the best configuration of hyper-parameters
-
-    GRID_PARAMETERS = {
-        "pop_size": [100, 250],
-        "mutation_rate": [0.001, 0.01],
-        "selection_method": ["Roulette", "Tournament"],
-        "crossover_rate": [0.6, 0.9],
-        "tournament_k": [3, 5, 10] 
-    }
-    
-    NUM_REPEATS_PER_CONFIG = 3 
-    MAX_GENS_PER_RUN = 600     
-    
+        # 3) select all the parents of the generation: a pair for every 2 offsprings
+        parents = iter(self.parent_indices(2 * (self.population_size // 2)))
+
+        # untill fully filling the new population
+        while len(new_population) < self.population_size:
+
+            # take the next 2 parents
+            (o1, t1), (o2, t2) = self.breed(next(parents), next(parents))
+
+            new_population.append(o1)
+            new_totals.append(t1)
+            if len(new_population) < self.population_size:
+                new_population.append(o2)
+                new_totals.append(t2)
     
-    all_results = []
-    run_counter = 0
-
-    for pop in GRID_PARAMETERS["pop_size"]:
-        for mut in GRID_PARAMETERS["mutation_rate"]:
-            for cross in GRID_PARAMETERS["crossover_rate"]:
-                for sel in GRID_PARAMETERS["selection_method"]:
-                    
-                    # if selection method is Roluette -> k = None
-                    # otherwise iterate on k values
-                    current_k_values = [None] if sel == "Roulette" else GRID_PARAMETERS["tournament_k"]
-                    
-                    for k_val in current_k_values:
-                        
-                        if sel == "Roulette":
-                            config_key = f"P={pop}, M={mut}, C={cross}, S={sel}"
-                            current_k_arg = None
-                        else:
-                            config_key = f"P={pop}, M={mut}, C={cross}, S={sel}(k={k_val})"
-                            current_k_arg = k_val
-
-                        run_counter += 1
-                        print(f"Run {run_counter}: {config_key}")
-                        
-                        histories = []
-                        final_scores = []
-                        
-                        for i in range(NUM_REPEATS_PER_CONFIG):
-
-                            gen_alg = GeneticAlgorithm(
-                                items=ITEMS,
-                                capacity=KNAPSACK_CAPACITY,
-                                population_size=pop,
-                                mutation_rate=mut,
-                                selection_method=sel,
-                                crossover_rate=cross,
-                                tournament_k=current_k_arg)
-
-                            hist, final_fit = gen_alg.run_experiment_config(MAX_GENS_PER_RUN)
-
-                            histories.append(hist)
-                            final_scores.append(final_fit)
-                        
-                        avg_history = np.mean(histories, axis=0)
-                        std_history = np.std(histories, axis=0)     
-                        avg_final_score = np.mean(final_scores)
-                        std_final_score = np.std(final_scores)
-
-                        all_results.append({
-                            "config": config_key,
-                            "history_mean": avg_history,
-                            "history_std": std_history,             
-                            "score": avg_final_score,
-                            "std": std_final_score
-                        })
-
-    print("\n======== Grid search completed ========")
+        self.population = new_population[:self.population_size]
+        if self.incremental_fitness:
+            self.totals = new_totals[:self.population_size]
     
-    # sort configs in descending based on score
-    all_results.sort(key=lambda x: x["score"], reverse=True)
+        self.evaluate_population()
 
-    # create a markdown report to save the results
-    print("Creating 'grid_search_report.md'...")
 
-    report_content = f""
-    "# Report Grid Search Estesa (con Tournament K)"
-    "**Known optimum:** {OPTIMAL_FITNESS}"
-    "## Ranking ({len(all_results)} configs)"
-    "| Rank | Configurazione | Fitness Media | Dev. Std |"
-    "| :--- | :--- | :--- | :--- |"
+    def next_generation_steady_state(self):
+        """
+        Steady-state generation: generate generation_gap * population_size offsprings and write them in place of
+        the worst individuals of the population, keeping the fitness (and the totals) in sync.
+        The population buffer is never reallocated, and the best individual is never replaced (elitism).
+        """
+        num_offsprings = min(max(1, round(self.generation_gap * self.population_size)), self.population_size - 1)
+        num_pairs = (num_offsprings + 1) // 2
 
-    for i, res in enumerate(all_results):
-        report_content += f"| {i+1} | {res['config']} | **{res['score']:.2f}** | {res['std']:.2f} |\n"
-        
-    with open("grid_search_report.md", "w", encoding='utf-8') as f:
-        f.write(report_content)
+        # slots of the worst individuals, which receive the offsprings
+        worst = np.argsort(self.fitness_scores, kind="stable")[:num_offsprings]
+
+        if self.representation == "numpy":
+            offsprings = self.offsprings_matrix(num_pairs)[:num_offsprings]
+            self.population[worst] = offsprings
+            self.fitness_scores[worst] = self.calculate_fitness_matrix(offsprings)
+            return
+
+        self.prefix_sums = {}
+
+        # 3) select the parents of the offsprings, all from the current population
+        parents = self.parent_indices(2 * num_pairs)
+
+        offsprings = []
+        for i in range(num_pairs):
+            offsprings.extend(self.breed(parents[2 * i], parents[2 * i + 1]))
+
+        for slot, (offspring, totals) in zip(worst.tolist(), offsprings):
+            self.population[slot] = offspring
+            if self.incremental_fitness:
+                self.totals[slot] = totals
+                weight, value = totals
+                self.fitness_scores[slot] = value if weight <= self.capacity else 0
+            else:
+                self.fitness_scores[slot] = self.cached_fitness(offspring)
+
+
+    def diversity(self):
+        """Return the population diversity, as the fraction of distinct individuals in the population."""
+        if self.representation == "numpy":
+            distinct = len(set(row.tobytes() for row in self.population))
+        elif self.representation == "bitset":
+            distinct = len(set(self.population))
+        else:
+            distinct = len(set(map(bytes, self.population)))
+
+        return distinct / len(self.population)
+
+
+    def check_stopping(self, start_time, stagnation_window=None, target_fitness=None, time_budget=None, min_diversity=None):
+        """
+        Check the stopping criteria (each one is disabled when None), returning the reason to stop or None.
+        - start_time: time.time() at the start of the evolution
+        - stagnation_window: max number of generations without improving the best solution
+        - target_fitness: fitness to reach (e.g. a known optimum)
+        - time_budget: max wall-clock seconds of the evolution
+        - min_diversity: min fraction of distinct individuals in the population, below it the population has collapsed
+        """
+        if target_fitness is not None and self.best_global_fitness >= target_fitness:
+            return "target_fitness"
+
+        if stagnation_window is not None and self.generation - self.last_improvement >= stagnation_window:
+            return "stagnation"
+
+        if time_budget is not None and time.time() - start_time >= time_budget:
+            return "time_budget"
+
+        if min_diversity is not None and self.diversity() < min_diversity:
+            return "diversity"
+
+        return None
+
+
+    def evolve(self, num_generations, stagnation_window=None, target_fitness=None, time_budget=None, min_diversity=None):
+        """
+        Perform num_generations generations of the genetic algorithm, continuing from the current population.
+        Stops earlier if one of the stopping criteria is met (see check_stopping); the reason is stored in stop_reason.
+        - num_generations: number of generations to perform
+        """
+
+        start_time = time.time()
+        self.stop_reason = "max_generation"
+
+        for _ in range(num_generations):
+
+            reason = self.check_stopping(start_time, stagnation_window, target_fitness, time_budget, min_diversity)
+            if reason is not None:
+                self.stop_reason = reason
+                break
+
+            self.fitness_history.append(self.best_global_fitness)
+
+            if self.generation_gap < 1:
+                self.next_generation_steady_state()
+            elif self.representation == "numpy":
+                self.next_generation_matrix()
+            else:
+                self.next_generation()
+
+            self.generation += 1
 
-    print("Creating 'convergence_lines.png'...")
+            # update the best solution found so far
+            self.update_best_solution()
+
+
+    def individual_to_list(self, individual):
+        """Return the list of genes (0/1) of an individual of the current representation."""
+        if self.representation == "numpy":
+            return individual.tolist()
+        if self.representation == "bitset":
+            return self.bitset_to_list(individual)
+        return individual[:]
+
+
+    def list_to_individual(self, genes):
+        """Return the individual of the current representation with the given list of genes (0/1)."""
+        if self.representation == "numpy":
+            return np.array(genes, dtype=np.uint8)
+        if self.representation == "bitset":
+            return self.positions_to_bitset(i for i, gene in enumerate(genes) if gene == 1)
+        return list(genes)
+
+
+    def finish_run(self):
+        """Store the best solution found in the run as a list of genes, and write the fitness history to its file."""
+        self.best_solution = self.individual_to_list(self.best_global_solution)
+        self.fitness_history.flush()
+
+
+    def run_experiment_config(self, max_generation, plot=False, stagnation_window=None, target_fitness=None,
+                              time_budget=None, min_diversity=None):
+        """
+        Perform the genetic algorithm, for max_generation generations or until a stopping criterion is met.
+        The reason of the stop is stored in stop_reason and the number of generations performed in generation.
+        - plot: True to show the plot of the fitness history in a window, or the path of its image file (see plot_single_run)
+        Returns the fitness history (list with the best fitness of each generation) and the best fitness.
+        - stagnation_window: max number of generations without improving the best solution
+        - target_fitness: fitness to reach (e.g. a known optimum)
+        - time_budget: max wall-clock seconds of the run
+        - min_diversity: min fraction of distinct individuals in the population, below it the population has collapsed
+        """
+
+        self.start_run()
+        self.evolve(max_generation, stagnation_window, target_fitness, time_budget, min_diversity)
+        self.finish_run()
+
+        if plot:
+            self.plot_single_run(self.fitness_history, plot if isinstance(plot, str) else None)
+
+        return self.fitness_history.tolist(), self.best_global_fitness
+
+
+    def emigrants(self, num_migrants):
+        """
+        Return the num_migrants best individuals of the population, which migrate to the other islands,
+        as lists of genes so that they can reach islands with a different representation.
+        - num_migrants: number of individuals to return
+        """
+        best = np.argsort(self.fitness_scores, kind="stable")[::-1][:num_migrants]
+        return [self.individual_to_list(self.population[i]) for i in best]
+
+
+    def immigrate(self, migrants):
+        """
+        Replace the worst individuals of the population with the migrants coming from other islands,
+        updating their fitness and the best solution found so far.
+        - migrants: lists of genes of the individuals to insert, at most population_size - 1
+        """
+        num_migrants = min(len(migrants), self.population_size - 1)
+        worst = np.argsort(self.fitness_scores, kind="stable")[:num_migrants]
+        migrants = [self.list_to_individual(genes) for genes in migrants[:num_migrants]]
+
+        if self.representation == "numpy":
+            self.population[worst] = migrants
+            self.fitness_scores[worst] = self.calculate_fitness_matrix(self.population[worst])
+        else:
+            for slot, migrant in zip(worst.tolist(), migrants):
+                self.population[slot] = migrant
+                if self.incremental_fitness:
+                    self.totals[slot] = self.calculate_totals(migrant)
+                    weight, value = self.totals[slot]
+                    self.fitness_scores[slot] = value if weight <= self.capacity else 0
+                else:
+                    self.fitness_scores[slot] = self.cached_fitness(migrant)
+
+        self.update_best_solution()
     
-    plt.figure(figsize=(14, 8))
     
-    # plot top 5 configs
-    for i in range(min(5, len(all_results))):
-        res = all_results[i]
-        mean = res['history_mean']
-        std  = res['history_std']
-        gens = np.arange(len(mean))
-
-        plt.plot(gens, mean, linewidth=2, label=f"Rank {i+1}: {res['config']}")
-        plt.fill_between(gens, mean - std, mean + std, alpha=0.2)   
+    def plot_single_run(self, fitness_history, plot_path=None):
+        """
+        Plot the fitness history of the genetic algorithm through the generations, in a window
+        or to an image file (plot_path). matplotlib is loaded only here, by the optional reporting module.
+        """
+        from genetic_algorithm_report import plot_fitness_history
+        plot_fitness_history(fitness_history, plot_path)
+
+
+###################################################################################################################
+# Bitset representation: each individual is packed in a python int, where the bit i is the gene i
+
+    def build_lookup_tables(self):
+        """
+        Precompute, for each byte of the packed individual, the total weight and value of the items 
+        corresponding to all the 256 possible values of that byte.
+        """
+        n_items = self.n_items
+        self.num_bytes = (n_items + 7) // 8
+
+        self.weight_table = []
+        self.value_table = []
+
+        for b in range(self.num_bytes):
+            weights = [0] * 256
+            values = [0] * 256
+
+            # each byte value is the one without its lowest set bit, plus the item of that bit
+            for byte in range(1, 256):
+                lowest_bit = (byte & -byte).bit_length() - 1
+                item = 8 * b + lowest_bit
+                weight, value = self.items[item] if item < n_items else (0, 0)
+                weights[byte] = weights[byte & (byte - 1)] + weight
+                values[byte] = values[byte & (byte - 1)] + value
+
+            self.weight_table.append(weights)
+            self.value_table.append(values)
+
+
+    def sample_positions(self, prob):
+        """
+        Return the sorted positions of the genes drawn independently with probability prob, 
+        jumping directly from one position to the next with geometric distributed gaps.
+        - prob: probability of each gene to be drawn
+        """
+        n_items = self.n_items
+
+        if prob <= 0:
+            return []
+        if prob >= 1:
+            return list(range(n_items))
+
+        positions = []
+        log_q = math.log(1 - prob)
+
+        # number of genes skipped before the next drawn one
+        i = int(math.log(1 - self.random.random()) / log_q)
+        while i < n_items:
+            positions.append(i)
+            i += int(math.log(1 - self.random.random()) / log_q) + 1
+
+        return positions
+
+
+    def positions_to_bitset(self, positions):
+        """Return the packed individual with the genes in the given positions set to 1."""
+        individual = 0
+        for i in positions:
+            individual |= 1 << i
+        return individual
+
+
+    def bitset_to_list(self, individual):
+        """Return the list of genes (0/1) of a packed individual."""
+        return [(individual >> i) & 1 for i in range(self.n_items)]
+
+
+    def totals_bitset(self, individual):
+        """Return the total weight and value of a packed individual, summing the totals of each non empty byte from the lookup tables."""
+        total_value = 0
+        total_weight = 0
+
+        for b, byte in enumerate(individual.to_bytes(self.num_bytes, "little")):
+            if byte:
+                total_value += self.value_table[b][byte]
+                total_weight += self.weight_table[b][byte]
+
+        return total_weight, total_value
+
+
+    def calculate_fitness_bitset(self, individual):
+        """
+        Calculate the fitness of a packed individual from its totals (see totals_bitset).
+        If the fitness exceeds the knapsack capacity the fitness is set to 0 so that the individual gets discarded.
+        """
+        total_weight, total_value = self.totals_bitset(individual)
+
+        if total_weight > self.capacity:
+            return 0
         
+        return total_value
+
+
+    def crossover_bitset(self, parent_one, parent_two, k):
+        """
+        Perform the 1-point crossover of two packed parents, combining the first k genes of a parent
+        with the others of the second one through a mask.
+        - k: crossover point
+        """
+        mask = (1 << k) - 1
+        offspring_one = (parent_one & mask) | (parent_two & ~mask)
+        offspring_two = (parent_two & mask) | (parent_one & ~mask)
+        return (offspring_one, offspring_two)
 
-    # known optimum line
-    plt.axhline(y=OPTIMAL_FITNESS, color='r', linestyle=':', linewidth=2, label='Known Optimum')
 
-    plt.title(f'Convergence curves: Top 5 Config (Avg on {NUM_REPEATS_PER_CONFIG} run)', fontsize=16)
-    plt.xlabel('Generations', fontsize=12)
-    plt.ylabel('Avg. Fitness', fontsize=12)
-    plt.legend(loc='lower right', fontsize='small') 
-    plt.grid(True)
-    plt.savefig("convergence_lines.png")
+    def mutation_bitset(self, individual):
+        """
+        Perform the mutation of a packed individual, as a XOR with a sparse random mask
+        where each gene has a probability mutation_rate to be set.
+        """
+        return individual ^ self.positions_to_bitset(self.sample_positions(self.mutation_rate))
+
+
+    def repair_bitset(self, individual):
+        """
+        Repair operator of a packed individual, working on the int directly (see repair_genes):
+        the totals come from the lookup tables and only the bits of the items dropped or picked are flipped.
+        """
+        total_weight, total_value = self.totals_bitset(individual)
+
+        # drop the worst items until the individual is feasible
+        if total_weight > self.capacity:
+            for i in reversed(self.ratio_order):
+                if individual >> i & 1:
+                    individual ^= 1 << i
+                    total_weight -= self.item_weights[i]
+                    if total_weight <= self.capacity:
+                        break
+
+        # greedily fill the leftover capacity, while the lightest item can still fit
+        if self.capacity - total_weight >= self.min_weight:
+            for i in self.ratio_order:
+                if not individual >> i & 1 and total_weight + self.item_weights[i] <= self.capacity:
+                    individual |= 1 << i
+                    total_weight += self.item_weights[i]
+                    if self.capacity - total_weight < self.min_weight:
+                        break
+
+        return individual
+
+
+###################################################################################################################
+# Numpy representation: the population is a (population_size, n_items) matrix
+
+    def inizialize_population_matrix(self):
+        """Initialize the population matrix of population_size number of individuals."""
+        PROB_TO_TAKE = 0.015   # probability of a gene of the individual to be 1
+
+        if self.initialization == "greedy":
+            self.population = np.array([self.randomized_greedy_genes() for _ in range(self.population_size)], dtype=np.uint8)
+            return
+
+        shape = (self.population_size, self.n_items)
+        self.population = (self.rng.random(shape) < PROB_TO_TAKE).astype(np.uint8)
+
+
+    def repair_matrix(self, population):
+        """
+        Repair all the individuals of the population matrix at once (see repair_genes).
+        Dropping the worst items until feasible keeps the longest prefix, in V/W ratio order, of the picked items 
+        that fits in the knapsack; then the leftover capacity of all the individuals is filled greedily, item by item.
+        - population: matrix with an individual for each row
+        """
+        order = np.array(self.ratio_order, dtype=np.int64)
+        sorted_weights = self.weights[order]
+
+        # genes in V/W ratio order, keeping only the prefix of picked items that fits
+        genes = population[:, order]
+        cumulative_weights = np.cumsum(genes * sorted_weights, axis=1)
+        genes = genes * (cumulative_weights <= self.capacity)
+        total_weights = genes @ sorted_weights
+
+        # greedy fill, until the lightest item can't fit in any individual
+        for j in range(len(order)):
+            if (self.capacity - total_weights).max() < self.min_weight:
+                break
+            fits = (genes[:, j] == 0) & (total_weights + sorted_weights[j] <= self.capacity)
+            genes[fits, j] = 1
+            total_weights += fits * sorted_weights[j]
+
+        repaired = np.empty_like(population)
+        repaired[:, order] = genes
+        return repaired
+
+
+    def calculate_fitness_matrix(self, population):
+        """
+        Calculate the fitness of all the individuals of the population matrix at once,
+        as a single matrix product with the weights and values of the items.
+        The fitness of the individuals exceeding the knapsack capacity is set to 0.
+        - population: matrix with an individual for each row
+        """
+        totals = population @ self.item_matrix  # column 0: total weight, column 1: total value
+
+        return np.where(totals[:, 0] > self.capacity, 0, totals[:, 1]).astype(np.int64)
+
+
+    def parent_selection_matrix(self, num_parents):
+        """
+        Select num_parents parents at once with the selection method of the configuration,
+        returning their indices in the population matrix.
+        - num_parents: number of parents to select
+        """
+
+        if self.selection_method == "Roulette":
+
+            cumulative_fitness = np.cumsum(self.fitness_scores)
+            total_fitness_sum = cumulative_fitness[-1]
+
+            # if the total fitness of the population is 0 just return random individuals
+            if total_fitness_sum == 0:
+                return self.rng.integers(0, self.population_size, num_parents)
+
+            # binary search of all the picks at once in the cumulative fitness
+            picks = self.rng.uniform(0, total_fitness_sum, num_parents)
+            parents = np.searchsorted(cumulative_fitness, picks, side="right")
+            return np.minimum(parents, self.population_size - 1)
+
+        return self.parent_indices_tournament(num_parents)
+
+
+    def crossover_matrix(self, parents_one, parents_two):
+        """
+        Perform the 1-point random crossover for all the pairs of parents at once, with probability crossover_rate.
+        A pair which does not cross over generates a copy of the parents.
+        - parents_one, parents_two: matrices with the first and the second parent of each pair in the rows
+        """
+        num_pairs, n_items = parents_one.shape
+
+        # crossover point of each pair, set to n_items (copy of the parents) for the pairs which don't cross over 
+        k = self.rng.integers(0, n_items - 1, num_pairs)
+        k = np.where(self.rng.random(num_pairs) < self.crossover_rate, k, n_items)
+
+        # mask[i, j] is True if the gene j of the offspring i comes from the first parent
+        mask = np.arange(n_items) < k[:, None]
+
+        offsprings_one = np.where(mask, parents_one, parents_two)
+        offsprings_two = np.where(mask, parents_two, parents_one)
+        return (offsprings_one, offsprings_two)
+
+
+    def mutation_matrix(self, population):
+        """
+        Perform the mutation of all the individuals of the population matrix, as a XOR with a Bernoulli mask: 
+        each gene has a probability mutation_rate to switch.
+        The mask is built sparsely, drawing how many genes switch and then which ones.
+        - population: matrix with an individual for each row
+        """
+        mask = np.zeros(population.size, dtype=np.uint8)
+        num_flips = self.rng.binomial(population.size, self.mutation_rate)
+        mask[self.rng.choice(population.size, num_flips, replace=False)] = 1
+
+        return population ^ mask.reshape(population.shape)
+
+
+    def next_generation_matrix(self):
+        """
+        Replace the population matrix with the next generation and compute its fitness.
+        """
+
+        # elitism takes the first row, the other rows are filled by the offsprings of num_pairs pairs of parents
+        offsprings = self.offsprings_matrix(self.population_size // 2)
+
+        # elitism: copy the best individual of the previous generartion directly in to the new one
+        self.population = np.vstack((self.best_global_solution[None, :], offsprings[:self.population_size - 1]))
+
+        self.fitness_scores = self.calculate_fitness_matrix(self.population)
+
+
+    def offsprings_matrix(self, num_pairs):
+        """
+        Generate the matrix of the offsprings of num_pairs pairs of parents, with crossover, mutation and,
+        if enabled, repair.
+        - num_pairs: number of pairs of parents, each one generating two offsprings
+        """
+        n_items = self.n_items
+
+        # 3) select all the parents of the offsprings
+        parents = self.parent_selection_matrix(2 * num_pairs)
+        parents_one = self.population[parents[0::2]]
+        parents_two = self.population[parents[1::2]]
+
+        # 4) crossover to generate the offsprings
+        offsprings_one, offsprings_two = self.crossover_matrix(parents_one, parents_two)
+
+        offsprings = np.empty((2 * num_pairs, n_items), dtype=np.uint8)
+        offsprings[0::2] = offsprings_one
+        offsprings[1::2] = offsprings_two
+
+        # 5) mutation of the offsprings
+        offsprings = self.mutation_matrix(offsprings)
+
+        if self.repair:
+            offsprings = self.repair_matrix(offsprings)
+
+        return offsprings
+
+
+# the knapsack problem instance is loaded from instances/ (see knapsack_instance):
+# ITEMS, KNAPSACK_CAPACITY, OPTIMAL_FITNESS and NUM_ITEMS are still importable from this module
+def __getattr__(name):
+    """Constants of the default knapsack instance (see knapsack_instance), loaded only when first used."""
+    if name in DEFAULT_CONSTANTS:
+        return default_constants()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+
+    # perform a grid search to find the best configuration of hyper-parameters:
+    # the runs are spread over a process pool and saved in a results store, so that the sweep can be resumed
+    from genetic_algorithm_grid_search import main
+    main()
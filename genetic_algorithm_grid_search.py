@@ -0,0 +1,264 @@
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from genetic_algorithm import GeneticAlgorithm, ITEMS, KNAPSACK_CAPACITY, OPTIMAL_FITNESS
+
+
+def build_configs(grid_parameters):
+    """
+    Build the list of configurations of the grid search, each one a dict with its key and the hyper-parameters.
+    With Roulette selection k is not used, so there is a single configuration with k = None.
+    - grid_parameters: dict with the values to try for each hyper-parameter
+    """
+    configs = []
+
+    for pop in grid_parameters["pop_size"]:
+        for mut in grid_parameters["mutation_rate"]:
+            for cross in grid_parameters["crossover_rate"]:
+                for sel in grid_parameters["selection_method"]:
+
+                    # if selection method is Roluette -> k = None
+                    # otherwise iterate on k values
+                    current_k_values = [None] if sel == "Roulette" else grid_parameters["tournament_k"]
+
+                    for k_val in current_k_values:
+
+                        if sel == "Roulette":
+                            config_key = f"P={pop}, M={mut}, C={cross}, S={sel}"
+                        else:
+                            config_key = f"P={pop}, M={mut}, C={cross}, S={sel}(k={k_val})"
+
+                        configs.append({
+                            "config": config_key,
+                            "population_size": pop,
+                            "mutation_rate": mut,
+                            "crossover_rate": cross,
+                            "selection_method": sel,
+                            "tournament_k": k_val
+                        })
+
+    return configs
+
+
+def run_seed(base_seed, config_key, repeat):
+    """Deterministic seed of a single run, derived from the base seed, the configuration and the repeat index."""
+    return zlib.crc32(f"{base_seed}|{config_key}|{repeat}".encode())
+
+
+def run_single(config, repeat, seed, max_generation, stopping_criteria=None):
+    """
+    Perform a single run of the genetic algorithm inside a worker process, returning its record for the results store.
+    - config: configuration of the run (see build_configs)
+    - repeat: index of the repeat of the configuration
+    - seed: seed of the run
+    - max_generation: max number of generations of the run
+    - stopping_criteria: keyword arguments of the stopping criteria of run_experiment_config (see check_stopping)
+    """
+    gen_alg = GeneticAlgorithm(
+        items=ITEMS,
+        capacity=KNAPSACK_CAPACITY,
+        population_size=config["population_size"],
+        mutation_rate=config["mutation_rate"],
+        selection_method=config["selection_method"],
+        crossover_rate=config["crossover_rate"],
+        tournament_k=config["tournament_k"],
+        seed=seed)
+
+    start = time.time()
+    hist, final_fit = gen_alg.run_experiment_config(max_generation, **(stopping_criteria or {}))
+    end = time.time()
+
+    return {
+        "config": config["config"],
+        "repeat": repeat,
+        "seed": seed,
+        "final_fitness": int(final_fit),
+        "history": hist,
+        "generations": gen_alg.generation,
+        "stop_reason": gen_alg.stop_reason,
+        "time": end - start
+    }
+
+
+def run_settings(max_generation, stopping_criteria, base_seed):
+    """
+    Settings shared by all the runs of a sweep, stored in each record: a run is reused on resume only if it was
+    performed with the same generation budget, stopping criteria and base seed.
+    """
+    # round trip through JSON, so that the settings compare equal to the ones read back from the store
+    return json.loads(json.dumps({"max_generation": max_generation, "stopping_criteria": stopping_criteria or {},
+                                  "base_seed": base_seed}))
+
+
+def load_results(results_path, settings=None):
+    """
+    Load the runs already completed from the results store (JSON lines), keyed by (config, repeat).
+    A truncated last line, left by an interrupted sweep, is ignored.
+    - settings: settings of the sweep (see run_settings): the records of runs performed with different settings
+                are stale and ignored (None to load all the records)
+    """
+    results = {}
+
+    if not os.path.exists(results_path):
+        return results
+
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if settings is not None and record.get("settings") != settings:
+                continue
+            results[(record["config"], record["repeat"])] = record
+
+    return results
+
+
+def run_grid_search(configs, num_repeats, max_generation, results_path, base_seed=0, max_workers=None, stopping_criteria=None):
+    """
+    Run all the configurations num_repeats times over a process pool, appending each finished run to the
+    results store as soon as it completes, so that an interrupted sweep resumes from the missing runs.
+    The runs of the store performed with other settings (generation budget, stopping criteria or base seed)
+    are performed again. Returns all the records of the store with the current settings.
+    - configs: configurations of the grid search (see build_configs)
+    - num_repeats: number of runs of each configuration
+    - max_generation: max number of generations of each run
+    - results_path: path of the results store (JSON lines)
+    - base_seed: base seed from which the seed of each run is derived
+    - max_workers: number of worker processes (None to use all the cores)
+    - stopping_criteria: keyword arguments of the stopping criteria of each run (see GeneticAlgorithm.check_stopping)
+    """
+    settings = run_settings(max_generation, stopping_criteria, base_seed)
+    results = load_results(results_path, settings)
+
+    pending = [(config, repeat) for config in configs for repeat in range(num_repeats)
+               if (config["config"], repeat) not in results]
+
+    print(f"Runs completed: {len(results)}. Runs to do: {len(pending)}")
+
+    # terminate the truncated last line of an interrupted sweep, so that the new records start on their own line
+    if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+        with open(results_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            truncated = f.read(1) != b"\n"
+        if truncated:
+            with open(results_path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, open(results_path, "a", encoding="utf-8") as store:
+
+        futures = [executor.submit(run_single, config, repeat, run_seed(base_seed, config["config"], repeat), 
+                                   max_generation, stopping_criteria)
+                   for config, repeat in pending]
+
+        for run_counter, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            record["settings"] = settings
+            results[(record["config"], record["repeat"])] = record
+
+            store.write(json.dumps(record) + "\n")
+            store.flush()
+
+            print(f"Run {run_counter}/{len(pending)}: {record['config']} (repeat {record['repeat']}) -> {record['final_fitness']} "
+                  f"after {record['generations']} generations ({record['stop_reason']})")
+
+    return results
+
+
+def summarize_results(results, configs, num_repeats):
+    """
+    Aggregate the runs of each configuration: mean and std of the fitness history and of the final fitness.
+    Returns the configurations sorted in descending order of mean final fitness.
+    """
+    all_results = []
+
+    for config in configs:
+        records = [results[(config["config"], repeat)] for repeat in range(num_repeats)
+                   if (config["config"], repeat) in results]
+        if not records:
+            continue
+
+        # runs stopped early are padded with their final best fitness, which would not change anymore
+        length = max(len(record["history"]) for record in records)
+        histories = [record["history"] + [record["final_fitness"]] * (length - len(record["history"])) for record in records]
+        final_scores = [record["final_fitness"] for record in records]
+
+        all_results.append({
+            "config": config["config"],
+            "history_mean": np.mean(histories, axis=0),
+            "history_std": np.std(histories, axis=0),
+            "score": np.mean(final_scores),
+            "std": np.std(final_scores)
+        })
+
+    # sort configs in descending based on score
+    all_results.sort(key=lambda x: x["score"], reverse=True)
+
+    return all_results
+
+
+def write_report(all_results, report_path):
+    """Create a markdown report with the ranking of the configurations."""
+
+    report_content = (
+        "# Report Grid Search Estesa (con Tournament K)\n\n"
+        f"**Known optimum:** {OPTIMAL_FITNESS}\n\n"
+        f"## Ranking ({len(all_results)} configs)\n\n"
+        "| Rank | Configurazione | Fitness Media | Dev. Std |\n"
+        "| :--- | :--- | :--- | :--- |\n"
+    )
+
+    for i, res in enumerate(all_results):
+        report_content += f"| {i+1} | {res['config']} | **{res['score']:.2f}** | {res['std']:.2f} |\n"
+
+    with open(report_path, "w", encoding='utf-8') as f:
+        f.write(report_content)
+
+
+def main():
+
+    print(f"======== Starting Grid Search (Pop, Mut, Sel, Cross, Tourn_K) ========")
+
+    # perform a grid search to find the best configuration of hyper-parameters
+
+    GRID_PARAMETERS = {
+        "pop_size": [100, 250],
+        "mutation_rate": [0.001, 0.01],
+        "selection_method": ["Roulette", "Tournament"],
+        "crossover_rate": [0.6, 0.9],
+        "tournament_k": [3, 5, 10]
+    }
+
+    NUM_REPEATS_PER_CONFIG = 3
+    MAX_GENS_PER_RUN = 600
+    RESULTS_PATH = "grid_search_results.jsonl"  # delete it to start a new sweep from scratch
+
+    # stop the runs that have converged: no improvement for STAGNATION_WINDOW generations or known optimum reached
+    STAGNATION_WINDOW = 200
+    STOPPING_CRITERIA = {"stagnation_window": STAGNATION_WINDOW, "target_fitness": OPTIMAL_FITNESS}
+
+    configs = build_configs(GRID_PARAMETERS)
+    results = run_grid_search(configs, NUM_REPEATS_PER_CONFIG, MAX_GENS_PER_RUN, RESULTS_PATH, 
+                              stopping_criteria=STOPPING_CRITERIA)
+
+    print("\n======== Grid search completed ========")
+
+    all_results = summarize_results(results, configs, NUM_REPEATS_PER_CONFIG)
+
+    # create a markdown report to save the results
+    print("Creating 'grid_search_report.md'...")
+    write_report(all_results, "grid_search_report.md")
+
+    # matplotlib is loaded only here, by the optional reporting module
+    from genetic_algorithm_report import plot_convergence
+
+    print("Creating 'convergence_lines.png'...")
+    plot_convergence(all_results, NUM_REPEATS_PER_CONFIG, "convergence_lines.png", OPTIMAL_FITNESS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import numpy as np
+from matplotlib.figure import Figure
+
+# Plots of the genetic algorithm runs. This module is imported only when a plot is requested,
+# so that the library and the worker processes never load matplotlib.
+# The plots written to image files are drawn on standalone figures, which render without a display and
+# without changing the pyplot backend of the process; pyplot is loaded only to show a plot in a window.
+
+
+def new_figure(plot_path, figsize):
+    """
+    Return a new figure: a standalone one to be saved to plot_path, or a pyplot one to be shown in a window.
+    - plot_path: path of the image file of the plot (None to show it)
+    """
+    if plot_path is not None:
+        return Figure(figsize=figsize)
+
+    import matplotlib.pyplot as plt
+    return plt.figure(figsize=figsize)
+
+
+def output_figure(figure, plot_path):
+    """Save the figure to plot_path, or show it in a window if plot_path is None."""
+    if plot_path is not None:
+        figure.savefig(plot_path)
+        return
+
+    import matplotlib.pyplot as plt
+    plt.show()
+
+
+def plot_fitness_history(fitness_history, plot_path=None):
+    """
+    Plot the fitness history of a run of the genetic algorithm through the generations.
+    - fitness_history: best fitness of each generation (list, numpy array or FitnessHistory)
+    - plot_path: path of the image file of the plot (None to show it in a window)
+    """
+    fitness_history = np.asarray(fitness_history)
+    gens = np.arange(len(fitness_history))
+
+    figure = new_figure(plot_path, (10, 6))
+    ax = figure.add_subplot()
+    ax.plot(gens, fitness_history, label='Fitness for generation', linewidth=2)
+
+    ax.set_title("Fitness Convergence")
+    ax.set_xlabel("Generation")
+    ax.set_ylabel("Fitness")
+    ax.grid(True)
+    ax.legend()
+    output_figure(figure, plot_path)
+
+
+def plot_convergence(all_results, num_repeats, plot_path, optimal_fitness=None):
+    """
+    Plot the mean convergence curves (with std band) of the top 5 configurations of a grid search.
+    - all_results: configurations sorted by score (see genetic_algorithm_grid_search.summarize_results)
+    - num_repeats: number of runs of each configuration
+    - plot_path: path of the image file of the plot (None to show it in a window)
+    - optimal_fitness: known optimum, drawn as a line (None to omit it)
+    """
+
+    figure = new_figure(plot_path, (14, 8))
+    ax = figure.add_subplot()
+
+    # plot top 5 configs
+    for i in range(min(5, len(all_results))):
+        res = all_results[i]
+        mean = res['history_mean']
+        std  = res['history_std']
+        gens = np.arange(len(mean))
+
+        ax.plot(gens, mean, linewidth=2, label=f"Rank {i+1}: {res['config']}")
+        ax.fill_between(gens, mean - std, mean + std, alpha=0.2)
+
+    # known optimum line
+    if optimal_fitness is not None:
+        ax.axhline(y=optimal_fitness, color='r', linestyle=':', linewidth=2, label='Known Optimum')
+
+    ax.set_title(f'Convergence curves: Top 5 Config (Avg on {num_repeats} run)', fontsize=16)
+    ax.set_xlabel('Generations', fontsize=12)
+    ax.set_ylabel('Avg. Fitness', fontsize=12)
+    ax.legend(loc='lower right', fontsize='small')
+    ax.grid(True)
+    output_figure(figure, plot_path)
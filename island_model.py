@@ -0,0 +1,120 @@
+from concurrent.futures import ProcessPoolExecutor
+from genetic_algorithm import GeneticAlgorithm
+
+
+class IslandModel:
+    """
+    Island model of the genetic algorithm: several populations (islands) evolve in parallel worker processes,
+    each one with its own seed and hyper-parameters. Every migration_interval generations the best individuals
+    of each island migrate to the neighbouring islands, where they replace the worst individuals.
+    """
+
+    def __init__(self, items, capacity, island_configs, migration_interval=50, num_migrants=2, topology="ring", seed=None):
+        """
+        - items: list of items, where each item is (weight, value)
+        - capacity: max capacity of the knapsack
+        - island_configs: list with the hyper-parameters of each island, as keyword arguments of GeneticAlgorithm
+                          (population_size, mutation_rate, selection_method, crossover_rate, tournament_k, ...)
+        - migration_interval: number of generations between two migrations
+        - num_migrants: number of best individuals sent by each island to each of its neighbours
+        - topology: "ring" (each island sends to the next one) or "fully_connected" (each island sends to all the others)
+        - seed: base seed of the run, island i uses seed + i (None for random seeds)
+        """
+        self.items = items
+        self.capacity = capacity
+        self.island_configs = island_configs
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.topology = topology
+        self.seed = seed
+
+        self.islands = []
+
+
+    def neighbours(self, island):
+        """Return the indices of the islands receiving the migrants of the given island."""
+        num_islands = len(self.islands)
+
+        if self.topology == "ring":
+            return [(island + 1) % num_islands] if num_islands > 1 else []
+
+        return [other for other in range(num_islands) if other != island]
+
+
+    def migrate(self):
+        """
+        Perform a migration: all the islands send their best individuals at the same time,
+        then each island receives the migrants of the islands it is connected to.
+        """
+        emigrants = [island.emigrants(self.num_migrants) for island in self.islands]
+
+        for i in range(len(self.islands)):
+            for j in self.neighbours(i):
+                self.islands[j].immigrate(emigrants[i])
+
+
+    def run(self, max_generation, max_workers=None):
+        """
+        Evolve all the islands for max_generation generations, migrating every migration_interval generations.
+        Returns the best fitness found by all the islands, the corresponding solution and the fitness history of each island.
+        - max_generation: number of generations of each island
+        - max_workers: number of worker processes (None to use all the cores)
+        """
+
+        self.islands = []
+        for i, config in enumerate(self.island_configs):
+            island_seed = self.seed + i if self.seed is not None else None
+            island = GeneticAlgorithm(self.items, self.capacity, seed=island_seed, **config)
+            island.start_run()
+            self.islands.append(island)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+
+            generation = 0
+            while generation < max_generation:
+
+                # each island evolves independently in a worker until the next migration
+                # (the islands are sent to the workers and returned with their evolved state)
+                num_generations = min(self.migration_interval, max_generation - generation)
+                self.islands = list(executor.map(evolve_island, self.islands, [num_generations] * len(self.islands)))
+                generation += num_generations
+
+                if generation < max_generation:
+                    self.migrate()
+
+        for island in self.islands:
+            island.finish_run()
+
+        best_island = max(self.islands, key=lambda island: island.best_global_fitness)
+        island_histories = [island.fitness_history.tolist() for island in self.islands]
+
+        return best_island.best_global_fitness, best_island.best_solution, island_histories
+
+
+def evolve_island(island, num_generations):
+    """Evolve the given island for num_generations generations inside a worker process, returning it."""
+    island.evolve(num_generations)
+    return island
+
+
+if __name__ == "__main__":
+
+    from genetic_algorithm import ITEMS, KNAPSACK_CAPACITY, OPTIMAL_FITNESS
+
+    # islands with different hyper-parameters, to explore the search space in different ways
+    ISLAND_CONFIGS = [
+        {"population_size": 250, "mutation_rate": 0.001, "selection_method": "Roulette", "crossover_rate": 0.6},
+        {"population_size": 250, "mutation_rate": 0.01, "selection_method": "Roulette", "crossover_rate": 0.9},
+        {"population_size": 250, "mutation_rate": 0.001, "selection_method": "Tournament", "crossover_rate": 0.6, "tournament_k": 3},
+        {"population_size": 250, "mutation_rate": 0.01, "selection_method": "Tournament", "crossover_rate": 0.9, "tournament_k": 5},
+    ]
+
+    print("Starting Island Model Genetic Algorithm ...")
+
+    model = IslandModel(ITEMS, KNAPSACK_CAPACITY, ISLAND_CONFIGS, migration_interval=50, num_migrants=2, topology="ring", seed=0)
+    best_fitness, best_solution, histories = model.run(max_generation=600)
+
+    print("\n======================= Result Island Model =======================")
+    for i, island in enumerate(model.islands):
+        print(f"Island {i}: best fitness {island.best_global_fitness}")
+    print(f"Best solution found: {best_fitness} (known optimum: {OPTIMAL_FITNESS})")
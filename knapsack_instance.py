@@ -0,0 +1,216 @@
+import json
+import os
+from functools import lru_cache
+import numpy as np
+
+# path of the default instance of the project (500 items), in the Pisinger format
+DEFAULT_INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances", "knapsack_500.csv")
+
+# names of the constants of the default instance, exported lazily by genetic_algorithm and branch_and_bound
+DEFAULT_CONSTANTS = ("ITEMS", "KNAPSACK_CAPACITY", "OPTIMAL_FITNESS", "NUM_ITEMS")
+
+
+class KnapsackInstance:
+    """
+    Instance of the 0/1 knapsack problem, with the weights and values of the items as numpy arrays
+    (possibly memory-mapped from the binary cache, see load_instance).
+    """
+
+    def __init__(self, weights, values, capacity, optimum=None, name=None):
+        """
+        - weights: array with the weight of each item
+        - values: array with the value of each item
+        - capacity: max capacity of the knapsack
+        - optimum: known optimal value (None if unknown)
+        - name: name of the instance
+        """
+        if len(weights) != len(values):
+            raise ValueError("The weights and the values must have the same length")
+
+        self.weights = weights
+        self.values = values
+        self.capacity = int(capacity)
+        self.optimum = int(optimum) if optimum is not None else None
+        self.name = name
+        self._items = None
+
+
+    @property
+    def items(self):
+        """List of items, where each item is (weight, value), as used by the solvers. Built on first access."""
+        if self._items is None:
+            self._items = list(zip(self.weights.tolist(), self.values.tolist()))
+        return self._items
+
+
+    def __len__(self):
+        return len(self.weights)
+
+
+    def __repr__(self):
+        return f"KnapsackInstance(name={self.name!r}, n={len(self)}, capacity={self.capacity}, optimum={self.optimum})"
+
+
+def parse_pisinger(path, index=0):
+    """
+    Parse an instance in the Pisinger format: a file with one or more instances, each one with a header
+    (name, "n <items>", "c <capacity>", "z <optimum>", "time <seconds>"), one line "i,value,weight,x" for each item
+    (x: the item is in the optimal solution) and a "-----" separator line.
+    - path: path of the file
+    - index: index of the instance in the file
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        blocks = [block for block in f.read().split("-----") if block.strip()]
+
+    if index >= len(blocks):
+        raise ValueError(f"{path} contains {len(blocks)} instances, no instance {index}")
+
+    lines = [line.strip() for line in blocks[index].splitlines() if line.strip()]
+    header = [line for line in lines if "," not in line]
+    rows = [line for line in lines if "," in line]
+
+    name = header[0]
+    fields = dict(line.split(maxsplit=1) for line in header[1:] if " " in line)
+
+    data = np.array(" ".join(rows).replace(",", " ").split(), dtype=np.int64).reshape(len(rows), -1)
+    if "n" in fields and int(fields["n"]) != len(data):
+        raise ValueError(f"{path}: expected {fields['n']} items, found {len(data)}")
+
+    optimum = int(fields["z"]) if "z" in fields else None
+    return KnapsackInstance(data[:, 2].copy(), data[:, 1].copy(), int(fields["c"]), optimum, name)
+
+
+def parse_simple(path):
+    """
+    Parse an instance in the simple format: a first line "<items> <capacity>", then one line "<value> <weight>"
+    for each item.
+    - path: path of the file
+    """
+    tokens = np.fromfile(path, dtype=np.int64, sep=" ")
+    n_items, capacity = int(tokens[0]), int(tokens[1])
+
+    data = tokens[2:]
+    if len(data) < 2 * n_items:
+        raise ValueError(f"{path}: expected {n_items} items, found {len(data) // 2}")
+
+    data = data[:2 * n_items].reshape(n_items, 2)
+    name = os.path.splitext(os.path.basename(path))[0]
+    return KnapsackInstance(data[:, 1].copy(), data[:, 0].copy(), capacity, None, name)
+
+
+def parse_orlib(path, index=0):
+    """
+    Parse an instance in the OR-Library format of mknap1: the number of instances, then for each instance
+    "<items> <constraints> <optimum>", the values, the weights of each constraint and the capacities.
+    Only instances with a single constraint are 0/1 knapsack problems.
+    - path: path of the file
+    - index: index of the instance in the file
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tokens = f.read().split()
+
+    num_instances = int(tokens[0])
+    if index >= num_instances:
+        raise ValueError(f"{path} contains {num_instances} instances, no instance {index}")
+
+    pos = 1
+    for _ in range(index + 1):
+        n_items, n_constraints, optimum = int(tokens[pos]), int(tokens[pos + 1]), float(tokens[pos + 2])
+        pos += 3
+        start = pos
+        pos += n_items + n_constraints * n_items + n_constraints
+
+    if n_constraints != 1:
+        raise ValueError(f"{path}: instance {index} has {n_constraints} constraints, only 1 is supported")
+
+    data = np.array(tokens[start:pos], dtype=np.float64).astype(np.int64)
+    values = data[:n_items]
+    weights = data[n_items:2 * n_items]
+    capacity = int(data[-1])
+
+    name = f"{os.path.splitext(os.path.basename(path))[0]}_{index}"
+    return KnapsackInstance(weights, values, capacity, int(optimum) if optimum > 0 else None, name)
+
+
+def detect_format(path):
+    """Guess the format of an instance file: "pisinger" (named header), "orlib" (single first token) or "simple"."""
+    with open(path, "r", encoding="utf-8") as f:
+        first_line = f.readline().split()
+
+    if not first_line or not all(token.lstrip("-").replace(".", "", 1).isdigit() for token in first_line):
+        return "pisinger"
+
+    return "orlib" if len(first_line) == 1 else "simple"
+
+
+def load_instance(path, fmt=None, index=0, cache_dir=None):
+    """
+    Load a knapsack instance from a file.
+    With a cache_dir, the parsed instance is stored in a binary cache (a .npy file with the weights and the values
+    and a .json file with the rest), from which the next loads memory-map the arrays instead of parsing the file.
+    The cache is rebuilt when the source file changes.
+    - path: path of the file
+    - fmt: "pisinger", "simple" or "orlib" (None to detect it, see detect_format)
+    - index: index of the instance, for the files with several instances
+    - cache_dir: directory of the binary cache (None to always parse the file)
+    """
+    if cache_dir is not None:
+        stat = os.stat(path)
+        source = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime, "index": index}
+
+        cache_name = f"{os.path.basename(path)}.{index}"
+        data_path = os.path.join(cache_dir, cache_name + ".npy")
+        meta_path = os.path.join(cache_dir, cache_name + ".json")
+
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["source"] == source:
+                return instance_from_cache(data_path, meta)
+
+    fmt = fmt or detect_format(path)
+    if fmt == "pisinger":
+        instance = parse_pisinger(path, index)
+    elif fmt == "simple":
+        instance = parse_simple(path)
+    elif fmt == "orlib":
+        instance = parse_orlib(path, index)
+    else:
+        raise ValueError(f"Unknown instance format: {fmt}")
+
+    if cache_dir is None:
+        return instance
+
+    # write the data before the metadata, so that an interrupted write leaves an invalid cache
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(data_path, np.stack((instance.weights, instance.values)).astype(np.int64))
+
+    meta = {"source": source, "capacity": instance.capacity, "optimum": instance.optimum, "name": instance.name}
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    return instance_from_cache(data_path, meta)
+
+
+def instance_from_cache(data_path, meta):
+    """Build the instance memory-mapping the (2, n_items) array of the binary cache."""
+    data = np.load(data_path, mmap_mode="r")
+    return KnapsackInstance(data[0], data[1], meta["capacity"], meta["optimum"], meta["name"])
+
+
+@lru_cache(maxsize=None)
+def default_instance():
+    """Return the default instance of the project, loaded once."""
+    return load_instance(DEFAULT_INSTANCE_PATH, "pisinger")
+
+
+@lru_cache(maxsize=None)
+def default_constants():
+    """Return the constants of the default instance (ITEMS, KNAPSACK_CAPACITY, OPTIMAL_FITNESS, NUM_ITEMS)."""
+    instance = default_instance()
+    return {
+        "ITEMS": instance.items,
+        "KNAPSACK_CAPACITY": instance.capacity,
+        "OPTIMAL_FITNESS": instance.optimum,
+        "NUM_ITEMS": len(instance)
+    }
@@ -1,9 +1,13 @@
 from connect_four import ConnectFour
 from minmax import MinMax
 from monte_carlo_tree_search import MCTS
-from test.llm import get_llm_move
+from transposition_table import TranspositionTable
+from test.llm import LLMMoveRequester
 import time
 
+# transposition table of MinMax, memory-mapped so that the positions searched in a game start warm in the next ones
+TRANSPOSITION_TABLE_PATH = "transposition_table.bin"
+
 def choose_game_mode():
     print("\n============== Connect Four ==============")
     print("Choose game mode:")
@@ -22,6 +26,7 @@ def choose_game_mode():
 def main():
 
     choice = choose_game_mode()
+    table = TranspositionTable(path=TRANSPOSITION_TABLE_PATH)
     
     if choice == 1:   # Minmax Alpha-Beta vs Human
         
@@ -48,7 +53,7 @@ def main():
 
             if game.to_play == minmax_player:
                 print("\nMinimax thinking...")
-                minmax = MinMax(game)
+                minmax = MinMax(game, transposition_table=table)
                 start_time = time.perf_counter()
                 minmax_move = minmax.get_best_move_alphabeta(depth_alphabeta, minmax_player, verbose=False)
                 end_time = time.perf_counter()
@@ -225,7 +230,7 @@ def main():
 
             else:
                 print("\nMinMax thinking...")
-                minmax = MinMax(game)
+                minmax = MinMax(game, transposition_table=table)
                 start_time = time.perf_counter()
                 minmax_move = minmax.get_best_move_alphabeta(depth_alphabeta, minmax_player, verbose=True)
                 end_time = time.perf_counter()
@@ -308,9 +313,16 @@ def main():
 
         invalid_gpt_moves = 0
         gpt_move_call_count = 0
+        cache_hits = 0
+        cache_misses = 0
         llm_costs = []
         llm_times = []
 
+        # when the LLM doesn't answer with a legal move in time, the move is chosen by a MinMax of depth 4
+        requester = LLMMoveRequester(
+            llm, time_budget=120,
+            fallback=lambda state: MinMax(state).get_best_move_alphabeta(4, ai_player=llm_player, verbose=False))
+
       
         while True:
             print("\n=====================================================")
@@ -345,7 +357,7 @@ def main():
                 else: # minimax turn
                     
                     print("\nMinMax thinking...")
-                    minmax = MinMax(game)
+                    minmax = MinMax(game, transposition_table=table)
 
                     start_time = time.perf_counter()
                     minmax_move = minmax.get_best_move_alphabeta(depth_alphabeta, ai_player=symbolic_ai_player, verbose=False)
@@ -360,40 +372,28 @@ def main():
             else:  # LLM turn
 
                 print("\nLLM thinking...")
-                while True:
-                    try:
-                        start_time = time.perf_counter()
-                        move_data = get_llm_move(llm, game) 
-                        end_time = time.perf_counter()
-                        
-                        llm_move = move_data["column"]
-                        llm_reason = move_data["reason"]
-                        cost = move_data["cost"]
-
-                        llm_costs.append(cost)
-                        gpt_move_call_count += 1
-
-                        if llm_move in game.available_moves():
-                            llm_times.append(end_time-start_time)
-
-                            print(f"LLM chooses column {llm_move}")
-                            print(f"Reason: {llm_reason}")
-                            print(f"LLM reasoned {(end_time-start_time):.4f}s")
-                            print(f"Cost: {cost}")
-
-                            if symbolic_ai_type == 1:
-                                mcts.move(llm_move)  
-                            else: 
-                                game.make_move(llm_move, game.to_play)
-                            break
-                        else:
-                            invalid_gpt_moves += 1
-                            print(f"LLM proposed illegal move: {llm_move}, retrying...")
-                    except Exception as e:
-                            print(f"Error during the LLM call: {e}, retrying...")
+                move_data = requester.get_move(game)
 
-                    
-                    
+                llm_move = move_data["column"]
+                llm_reason = move_data["reason"]
+                cost = move_data["cost"]
+
+                llm_costs.append(cost)
+                llm_times.append(move_data["time"])
+                gpt_move_call_count += move_data["attempts"]
+                invalid_gpt_moves += move_data["invalid"]
+                cache_hits += move_data["cache_hits"]
+                cache_misses += move_data["cache_misses"]
+
+                print(f"LLM chooses column {llm_move}" + (" (fallback engine)" if move_data["fallback"] else ""))
+                print(f"Reason: {llm_reason}")
+                print(f"LLM reasoned {move_data['time']:.4f}s")
+                print(f"Cost: {cost}")
+
+                if symbolic_ai_type == 1:
+                    mcts.move(llm_move)  
+                else: 
+                    game.make_move(llm_move, game.to_play)
 
         winner = game.check_winner()
         
@@ -411,5 +411,14 @@ def main():
 
         print("GPT move call count:", gpt_move_call_count)
         print("Invalid GPT moves:", invalid_gpt_moves)
+        print(f"LLM cache: {cache_hits} hits, {cache_misses} misses")
+        print(f"Fallback moves: {requester.fallback_moves}. Hedged requests: {requester.hedged_requests}")
+        latency = requester.latency_percentiles()
+        print("LLM move latency: " + ", ".join(f"p{p} {t:.2f}s" for p, t in latency["move"].items() if t is not None))
+        requester.close()
+        print(f"Total cost: {requester.total_cost:.4f}$ (moves: {sum(llm_costs):.4f}$)")
+
+    table.close()
+
 
 main()
@@ -1,4 +1,5 @@
 import random
+from transposition_table import TranspositionTable
 
 class MinMax:
 
@@ -9,9 +10,47 @@ class MinMax:
     - Opponent (minimizing player): attempts to minimize the AI's score
     """
 
-    def __init__(self, game):
+    def __init__(self, game, opening_book=None, transposition_table=None):
         self.game = game  # current state of the game 
         self.nodes_explored = 0  # number of nodes explored during the minimax search for the best move
+        self.opening_book = opening_book  # optional opening book (see opening_book.py), looked up before searching
+        self.transposition_table = transposition_table  # optional table of the positions already searched (see transposition_table.py)
+        self.threat_extension = 0  # max number of plies searched beyond max_depth along forcing moves (see get_best_move_alphabeta)
+        self.threats = False  # whether the root moves are filtered by the threat analysis (see get_best_move_alphabeta)
+
+
+    def table_key(self, to_play, ai_player, heuristic):
+        """
+        Key of the current position in the transposition table: the scores depend on the player they are relative to,
+        on the evaluation at the horizon and on the search settings (threat extension beyond the horizon and threat
+        analysis of the root moves), so they are part of the key with the position.
+        The position key is canonical, so a position and its left-right reflection share the entry (see ConnectFour.canonical_key).
+        Returns (key, mirrored), where mirrored is True if the moves of the entry are mirrored with respect to the current position.
+        - to_play: player to move
+        - ai_player: player with respect to maximize the score
+        - heuristic: flag which indicates whether to use the heuristic evaluation
+        """
+        key, mirrored = self.game.canonical_key(to_play)
+        # 50 bits of the position + 11 bits of the settings: the key fits in the 64 bits of the table
+        # (the saved tables record the layout of the keys: bump TranspositionTable.KEY_LAYOUT when it changes)
+        settings = (min(self.threat_extension, 0xFF) << 3) | (bool(self.threats) << 2) | \
+                   ((ai_player == self.game.player1) << 1) | bool(heuristic)
+        return (key << 11) | settings, mirrored
+
+
+    def probe_table(self, table_key, mirrored):
+        """Look up the current position in the transposition table, returning (score, draft, bound, move) or None."""
+        entry = self.transposition_table.probe(table_key)
+        if entry is not None and mirrored and entry[3] is not None:
+            entry = entry[:3] + (self.game.mirror_move(entry[3]),)
+        return entry
+
+
+    def store_table(self, table_key, mirrored, score, draft, bound, move):
+        """Store the result of the search of the current position in the transposition table."""
+        if mirrored and move is not None:
+            move = self.game.mirror_move(move)
+        self.transposition_table.store(table_key, score, draft, bound, move)
 
 
     def minmax(self, depth, is_maximizing, max_depth=1, ai_player=None):
@@ -153,6 +192,14 @@ class MinMax:
         if winner == ai_player:
             return float("inf")
         if self.game.is_board_full() or depth >= max_depth:  # Depth limited version
+
+            # threat extension: a position at the horizon with a pending immediate threat (a win of the player to move,
+            # or a win of the opponent to block) is not evaluated, but searched further along the forcing moves only
+            if depth < max_depth + self.threat_extension and not self.game.is_board_full():
+                to_play = ai_player if is_maximizing else opponent_player
+                forced = self.game.threat_analysis(to_play)["forced"]
+                if forced:
+                    return self.search_forced_moves(forced, depth, is_maximizing, alpha, beta, max_depth, ai_player, heuristic)
                
             if not heuristic:
                 score = 0   # with depth limited a score = 0 is not useful to discriminate between bad/good moves
@@ -161,30 +208,61 @@ class MinMax:
     
             return score  
 
+        # transposition table: reuse the result of a search of the same position at least as deep,
+        # or at least try first the best move it found
+        moves = self.game.available_moves()
+        table_key = None
+        alpha_start, beta_start = alpha, beta
+
+        if self.transposition_table is not None:
+            table_key, mirrored = self.table_key(ai_player if is_maximizing else opponent_player, ai_player, heuristic)
+            entry = self.probe_table(table_key, mirrored)
+
+            if entry is not None:
+                table_score, draft, bound, table_move = entry
+
+                if draft >= max_depth - depth:
+                    if bound == TranspositionTable.EXACT:
+                        return table_score
+                    if bound == TranspositionTable.LOWER:
+                        alpha = max(alpha, table_score)
+                    else:
+                        beta = min(beta, table_score)
+                    if alpha >= beta:
+                        return table_score
+
+                if table_move in moves:
+                    moves.remove(table_move)
+                    moves.insert(0, table_move)
+
+        best_move = None
+
         if is_maximizing:
 
             best_score = float("-inf")
 
-            for move in self.game.available_moves():
+            for move in moves:
                 row = self.game.make_temporary_move(move, ai_player)
                 score = self.minmax_alphabeta_pruning(depth + 1, False, alpha, beta, max_depth, ai_player)
                 self.game.undo_move(move, row)
+                if score > best_score or best_move is None:
+                    best_move = move
                 best_score = max(best_score, score)
                 alpha = max(alpha, best_score) # update alpha : best score found for the maximizing player
 
                 if alpha >= beta:
                     break  # pruning : the current situation is already better than anything the minimizer can achieve
 
-            return best_score
-        
         else:
 
             best_score = float("inf")
 
-            for move in self.game.available_moves():
+            for move in moves:
                 row = self.game.make_temporary_move(move, opponent_player)
                 score = self.minmax_alphabeta_pruning(depth + 1, True, alpha, beta, max_depth, ai_player)
                 self.game.undo_move(move, row)
+                if score < best_score or best_move is None:
+                    best_move = move
                 best_score = min(best_score, score)
                 beta = min(beta, best_score)  # update alpha : best score found for the minimizing player
 
@@ -194,10 +272,50 @@ class MinMax:
                 if beta <= alpha:
                     break  # pruning : the current situation is already worse than anything the maximizer can achieve elsewhere
 
-            return best_score
+        if table_key is not None:
+            # the score is exact only if it falls inside the window the node was searched with
+            if best_score <= alpha_start:
+                bound = TranspositionTable.UPPER
+            elif best_score >= beta_start:
+                bound = TranspositionTable.LOWER
+            else:
+                bound = TranspositionTable.EXACT
+            self.store_table(table_key, mirrored, best_score, max_depth - depth, bound, best_move)
+
+        return best_score
 
     
-    def get_best_move_alphabeta(self, max_depth=1, ai_player=None, heuristic=True, verbose=False):
+    def search_forced_moves(self, forced, depth, is_maximizing, alpha, beta, max_depth, ai_player, heuristic):
+        """
+        Searches only the forcing moves of a position beyond the horizon (threat extension), like minmax_alphabeta_pruning.
+        Each extended ply counts against the threat_extension cap, since the depth keeps increasing past max_depth.
+        - forced: forcing moves of the position (see ConnectFour.threat_analysis)
+        """
+
+        opponent_player = self.game.player1 if ai_player == self.game.player2 else self.game.player2
+        player = ai_player if is_maximizing else opponent_player
+        best_score = float("-inf") if is_maximizing else float("inf")
+
+        for move in forced:
+            row = self.game.make_temporary_move(move, player)
+            score = self.minmax_alphabeta_pruning(depth + 1, not is_maximizing, alpha, beta, max_depth, ai_player, heuristic)
+            self.game.undo_move(move, row)
+
+            if is_maximizing:
+                best_score = max(best_score, score)
+                alpha = max(alpha, best_score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, best_score)
+
+            if alpha >= beta:
+                break
+
+        return best_score
+
+
+    def get_best_move_alphabeta(self, max_depth=1, ai_player=None, heuristic=True, verbose=False, threats=False,
+                                threat_extension=0):
         """
         Returns the best move for the AI's turn, calling minmax + alpha beta pruning to evaluate
         all possible moves and returning the one with the highest score.
@@ -205,17 +323,58 @@ class MinMax:
         - ai_player: player with respect to maximize the score
         - heuristic: flag which indicates whether to use the heuristic evaluation
         - verbose: flag to print the selected move with the corresponding score       
+        - threats: flag which indicates whether to run the threat analysis before the search (see ConnectFour.threat_analysis)
+        - threat_extension: max number of plies searched beyond max_depth along forcing moves (wins and blocks),
+          to avoid evaluating positions with pending threats at the horizon (0 to disable)
         """
         
         if ai_player is None:
             ai_player = self.game.player2    
 
         self.nodes_explored = 0
+        self.threat_extension = threat_extension
+        self.threats = threats
+
+        # threat analysis: an immediate win or a forced block is played without searching, and the moves
+        # which let the opponent win on the next move are not searched (unless all the moves do)
+        moves = self.game.available_moves()
+        if threats:
+            analysis = self.game.threat_analysis(ai_player)
+            if analysis["forced"]:
+                if verbose:
+                    print(f"Selected move for '{ai_player}' : column {analysis['forced'][0]} forced by the threat analysis")
+                return analysis["forced"][0]
+            moves = analysis["safe"] or moves
+
+        # position already searched at least as deep (e.g. in a previous game): its best move, without searching
+        root_key = None
+        if self.transposition_table is not None:
+            root_key, root_mirrored = self.table_key(ai_player, ai_player, heuristic)
+            entry = self.probe_table(root_key, root_mirrored)
+            if entry is not None:
+                table_score, draft, bound, table_move = entry
+                if bound == TranspositionTable.EXACT and draft >= max_depth + 1 and table_move in self.game.available_moves():
+                    if verbose:
+                        print(f"Selected move for '{ai_player}' : column {table_move} with final score {table_score} (transposition table)")
+                    return table_move
+
+        # early game: the move precomputed by a deep search in the opening book, without searching
+        if self.opening_book is not None:
+            book_move = self.opening_book.lookup(self.game, ai_player)
+            if book_move is not None and book_move in self.game.available_moves():
+                if verbose:
+                    print(f"Selected move for '{ai_player}' : column {book_move} from the opening book")
+                return book_move
 
         best_score = float("-inf")
         best_move = None
 
-        for move in self.game.available_moves():
+        # in a symmetric position (e.g. the empty board) a move and its mirror have the same score:
+        # search only the one on the left, which the loop would select anyway on a tie
+        if self.game.is_symmetric():
+            moves = [move for move in moves if move <= self.game.mirror_move(move)]
+
+        for move in moves:
             row = self.game.make_temporary_move(move, ai_player)
 
             # start of the recursion:
@@ -239,4 +398,8 @@ class MinMax:
         if best_score == float("-inf"):
             best_move = random.choice(self.game.available_moves())
 
-        return best_move
\ No newline at end of file
+        # the root moves are searched with the full window, so the score of the root is exact
+        if root_key is not None:
+            self.store_table(root_key, root_mirrored, best_score, max_depth + 1, TranspositionTable.EXACT, best_move)
+
+        return best_move
@@ -38,14 +38,63 @@ class Node:
         return exploitation + exploration
 
 
+class SharedNode(Node):
+    """
+    Node whose statistics are shared by all the nodes of the same canonical position (see ConnectFour.canonical_key):
+    a position and its left-right reflection, reached by any order of moves, accumulate the same wins and visits.
+    The statistics are bound on the first visit of the node, when its position is on the board (see MCTS.bind).
+    """
+
+    def __init__(self, move=None, parent=None, player=None):
+        self.move = move
+        self.parent = parent
+        self.children = {}
+        self.player = player
+        self.stats = None  # [wins, visits] shared by the nodes of the position, None until bound
+
+
+    @property
+    def wins(self):
+        return self.stats[0] if self.stats is not None else 0
+
+    @wins.setter
+    def wins(self, wins):
+        self.stats[0] = wins
+
+
+    @property
+    def visits(self):
+        return self.stats[1] if self.stats is not None else 0
+
+    @visits.setter
+    def visits(self, visits):
+        self.stats[1] = visits
+
+
 class MCTS:
 
-    def __init__(self, state, ai_player):
+    def __init__(self, state, ai_player, opening_book=None, symmetry=False, threats=False):
         self.root_state = state #  root starting state for rollouts
         self.root = Node() # root node
         self.ai_player = ai_player # symbol of the player
         self.num_rollout = 0 # number of rollouts performed
         self.run_time = 0 # effective time
+        self.opening_book = opening_book # optional opening book (see opening_book.py), looked up before searching
+        self.symmetry = symmetry # share the statistics of mirrored positions, expanding one of each pair of mirrored moves
+        self.statistics_table = {} # canonical key -> [wins, visits] of the positions, with symmetry (see SharedNode)
+        self.threats = threats # expand only the forced moves, or the safe ones, found by the threat analysis
+
+
+    def book_move(self):
+        """Returns the move of the opening book for the current state, None without a book or if the state is not in it."""
+
+        if self.opening_book is None or self.root_state.to_play != self.ai_player:
+            return None
+
+        move = self.opening_book.lookup(self.root_state)
+        if move is None or move not in self.root_state.available_moves():
+            return None
+        return move
 
     """
     Selection: Starting from the root, we traverse the tree, choosing the child that maximizes the UCB1 value
@@ -69,6 +118,7 @@ class MCTS:
             # applies the current node's move to the selected child
             row = state.make_temporary_move(node.move, node.player)  # store the row to undo the move later
             path_moves.append((node.move, row))  # store the move (column) to undo the move later
+            self.bind(node, state)
 
         # expansion of the current node
         expanded = self.expand(node, state) 
@@ -83,6 +133,7 @@ class MCTS:
             # make the move of the new chosen child, and store the row and columns to undo it later
             row = state.make_temporary_move(child.move, child.player)
             path_moves.append((child.move, row))
+            self.bind(child, state)
 
             return child, path_moves  # the selected child is node to roll out 
         
@@ -102,10 +153,24 @@ class MCTS:
             return False
 
         # non-leaf node: creates a child node for each available move
+        # in a symmetric position (e.g. the empty board) a move and its mirror lead to mirrored positions, which share
+        # their statistics (see SharedNode): only the one on the left is expanded, so the children are not duplicated
+        moves = state.available_moves()
+
+        # threat analysis: when the position forces a move (an immediate win or block) it is the only child,
+        # otherwise the moves which let the opponent win on the next move are not expanded (unless all the moves do)
+        if self.threats:
+            analysis = state.threat_analysis(state.to_play)
+            moves = analysis["forced"] or analysis["safe"] or moves
+
+        if self.symmetry and state.is_symmetric():
+            moves = [move for move in moves if move <= state.mirror_move(move)]
+
         children = []
         current_player = state.to_play
-        for move in state.available_moves():
-            children.append(Node(move, parent, current_player))
+        node_class = SharedNode if self.symmetry else Node
+        for move in moves:
+            children.append(node_class(move, parent, current_player))
 
         # add all children to the current node
         parent.add_children(children)
@@ -184,6 +249,12 @@ class MCTS:
         - time_limit =seconds for the MCTS to run rollouts
         """
 
+        # early game: the move comes from the opening book, no rollouts needed
+        if self.book_move() is not None:
+            self.num_rollout = 0
+            self.run_time = 0
+            return
+
         start_time = time.time()
         num_rollouts = 0
 
@@ -218,6 +289,11 @@ class MCTS:
         - max_rollout = number of rollout to be done
         """
 
+        if self.book_move() is not None:
+            self.num_rollout = 0
+            self.run_time = 0
+            return
+
         start_time = time.process_time()
         num_rollouts = 0
 
@@ -254,6 +330,11 @@ class MCTS:
         # if the game is already over there is no point in making a move
         if self.root_state.game_over():
             return -1
+
+        # move precomputed by a deep search in the opening book
+        book_move = self.book_move()
+        if book_move is not None:
+            return book_move
         
         # find the maximum visits between the children of the root
         max_visits = max(n.visits for n in self.root.children.values())
@@ -273,6 +354,12 @@ class MCTS:
         it has already explored so as not to have to start from scratch each time, keeping the MCTS synchronized with the real game state.
         """
 
+        # in a symmetric position the mirror of the move may have been expanded in its place:
+        # its subtree, mirrored, holds the statistics of the move
+        mirror = self.root_state.mirror_move(move)
+        if move not in self.root.children and mirror in self.root.children and self.root_state.is_symmetric():
+            self.mirror_subtree(self.root.children.pop(mirror))
+
         # apply the move on the actual state of the game
         self.root_state.make_move(move, self.root_state.to_play)
 
@@ -288,6 +375,36 @@ class MCTS:
             self.expand(self.root, self.root_state)
 
 
+    def bind(self, node, state):
+        """
+        Bind a node to the shared statistics of its position (see SharedNode), on its first visit.
+        - node: node just selected
+        - state: state of the game after the move of the node
+        """
+        if isinstance(node, SharedNode) and node.stats is None:
+            # the temporary moves don't switch the player to move: the opponent of the player of the node moves next
+            key, _ = state.canonical_key(state.player2 if node.player == state.player1 else state.player1)
+            node.stats = self.statistics_table.setdefault(key, [0, 0])
+
+
+    def mirror_subtree(self, node):
+        """
+        Mirror left-right the moves of a node and of all its descendants, re-attaching it to its parent.
+        - node: root of the subtree to mirror
+        """
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current.move = self.root_state.mirror_move(current.move)
+            children = list(current.children.values())
+            current.children = {}
+            for child in children:
+                current.children[self.root_state.mirror_move(child.move)] = child
+            stack.extend(children)
+
+        node.parent.children[node.move] = node
+
+
     def statistics(self):
         """
         Statistics per debug/analisi.
@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+import numpy as np
+from connect_four import ConnectFour
+from minmax import MinMax
+
+
+class OpeningBook:
+    """
+    Opening book of Connect Four: the best move of each position of the first plies, precomputed offline
+    with a deep alpha-beta search (see build_opening_book).
+    The book is stored on disk as a compact array of fixed-size records (position key, move) sorted by key.
+    The keys are canonical (see ConnectFour.canonical_key): a position and its left-right reflection share
+    a single record, with the move of the position with the smaller key.
+    The book can be memory-mapped and searched with a binary search, or loaded in a dict for O(1) lookups.
+    """
+
+    # record of a position: key (uint64) + best move (uint8), 9 bytes without padding
+    RECORD = np.dtype([("key", "<u8"), ("move", "u1")])
+
+
+    def __init__(self, records, use_dict=False):
+        """
+        - records: array of RECORD sorted by key (possibly memory-mapped)
+        - use_dict: load the records in a dict instead of searching the array
+        """
+        self.records = records
+        self.table = None
+
+        if use_dict:
+            self.table = dict(zip(records["key"].tolist(), records["move"].tolist()))
+
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load the book from its file.
+        - mmap: memory-map the records (binary search on the mapped keys), otherwise read them in a dict
+        """
+        if mmap:
+            return cls(np.memmap(path, dtype=cls.RECORD, mode="r"))
+        return cls(np.fromfile(path, dtype=cls.RECORD), use_dict=True)
+
+
+    def save(self, path):
+        """Write the records of the book to its file."""
+        np.ascontiguousarray(self.records).tofile(path)
+
+
+    def __len__(self):
+        return len(self.records)
+
+
+    def lookup(self, game, to_play=None):
+        """
+        Return the book move of the position, None if the position is not in the book.
+        - game: current state of the game
+        - to_play: player to move (None for game.to_play)
+        """
+        key, mirrored = game.canonical_key(to_play)
+
+        if self.table is not None:
+            move = self.table.get(key)
+        else:
+            keys = self.records["key"]
+            i = int(np.searchsorted(keys, np.uint64(key)))
+            move = int(self.records["move"][i]) if i < len(keys) and int(keys[i]) == key else None
+
+        if move is not None and mirrored:
+            move = game.mirror_move(move)
+        return move
+
+
+def book_positions(max_plies):
+    """
+    Return the non-terminal positions reachable in at most max_plies plies from the empty board,
+    with either player starting, as a dict canonical key -> (board, player to move, mirrored), without duplicated
+    transpositions and reflections (see ConnectFour.canonical_key).
+    """
+    positions = {}
+
+    game = ConnectFour()
+    frontier = []
+    for starter in (game.player1, game.player2):
+        start = ConnectFour()
+        start.to_play = starter
+        frontier.append(start)
+
+    for ply in range(max_plies + 1):
+        next_frontier = []
+
+        for state in frontier:
+            key, mirrored = state.canonical_key()
+            if key in positions or state.game_over():
+                continue
+            positions[key] = (deepcopy(state.board), state.to_play, mirrored)
+
+            if ply < max_plies:
+                for move in state.available_moves():
+                    child = deepcopy(state)
+                    child.make_move(move, child.to_play)
+                    next_frontier.append(child)
+
+        frontier = next_frontier
+
+    return positions
+
+
+def book_move(position, depth):
+    """
+    Compute the best move of a position with an alpha-beta search of the given depth, inside a worker process.
+    The move is mirrored if the key is the one of the reflection of the position.
+    """
+    key, (board, to_play, mirrored) = position
+
+    game = ConnectFour()
+    game.board = board
+    game.to_play = to_play
+
+    move = MinMax(game).get_best_move_alphabeta(depth, ai_player=to_play, verbose=False)
+    return key, game.mirror_move(move) if mirrored else move
+
+
+def build_opening_book(max_plies, depth, path, max_workers=None):
+    """
+    Build the opening book of all the positions up to max_plies plies, searching each one with alpha-beta
+    at the given depth over a process pool, and save it to path. Returns the book.
+    - max_plies: max number of plies of the positions in the book
+    - depth: depth of the alpha-beta search of each position
+    - path: path of the book file
+    - max_workers: number of worker processes (None to use all the cores)
+    """
+    positions = book_positions(max_plies)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        moves = dict(executor.map(book_move, positions.items(), [depth] * len(positions), chunksize=16))
+
+    records = np.array(sorted(moves.items()), dtype=OpeningBook.RECORD)
+    book = OpeningBook(records)
+    book.save(path)
+
+    return book
+
+
+if __name__ == "__main__":
+
+    import time
+
+    MAX_PLIES = 4
+    DEPTH = 7
+    BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+    print(f"Building the opening book: positions up to {MAX_PLIES} plies, alpha-beta depth {DEPTH} ...")
+    start = time.time()
+    book = build_opening_book(MAX_PLIES, DEPTH, BOOK_PATH)
+    print(f"{len(book)} positions in {time.time() - start:.1f}s, saved to {BOOK_PATH}")
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from branch_and_bound import *
+from branch_and_bound import ITEMS, KNAPSACK_CAPACITY  # default instance, loaded lazily
 
 n = int(input("Number of runs: "))
 
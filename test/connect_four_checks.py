@@ -0,0 +1,219 @@
+import os
+import random
+import sys
+import tempfile
+from copy import deepcopy
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connect_four import ConnectFour
+from minmax import MinMax
+from monte_carlo_tree_search import MCTS
+from opening_book import OpeningBook, book_positions
+from transposition_table import TranspositionTable
+
+# Quick checks of the Connect Four engines and of their tables, run as a script:
+# each check prints its result and an AssertionError stops the script at the first failure.
+
+
+def mirrored(game):
+    """Return a copy of the game with the board reflected left-right."""
+    mirror = deepcopy(game)
+    mirror.board = [row[::-1] for row in game.board]
+    return mirror
+
+
+def play(moves):
+    """Return a game after the given moves, played alternately from the empty board."""
+    game = ConnectFour()
+    for move in moves:
+        game.make_move(move, game.to_play)
+    return game
+
+
+def check_transposition_table():
+    """
+    An entry is found as stored, an entry with a corrupted check word is treated as missing, and a table file
+    is reloaded only with the current header.
+    """
+    table = TranspositionTable(1 << 10)
+    key = play([3, 3, 2, 4]).position_key()
+
+    assert table.probe(key) is None
+    table.store(key, -12.5, 6, TranspositionTable.LOWER, 4)
+    assert table.probe(key) == (-12.5, 6, TranspositionTable.LOWER, 4), table.probe(key)
+
+    # a torn entry (e.g. written concurrently by another process) fails the check
+    table.words[table.slot(key)] ^= 1
+    assert table.probe(key) is None
+
+    with tempfile.TemporaryDirectory() as tables_dir:
+        path = os.path.join(tables_dir, "table.tt")
+
+        # memory-mapped file, reloaded in the next run
+        table = TranspositionTable(1 << 10, path=path)
+        table.store(key, 3, 5, TranspositionTable.EXACT, 2)
+        table.close()
+        table = TranspositionTable(path=path)
+        assert table.probe(key) == (3, 5, TranspositionTable.EXACT, 2) and len(table) == 1 << 10
+        entries = np.array(table.array)
+
+        # copy of a shared table, loaded by the next shared table
+        copy_path = os.path.join(tables_dir, "copy.tt")
+        table.save(copy_path)
+        table.close()
+        shared = TranspositionTable.shared(1 << 10, copy_path)
+        assert shared.probe(key) == (3, 5, TranspositionTable.EXACT, 2)
+        shared.close()
+        shared.unlink()
+
+        # a file without the header, or with the keys of another layout, is discarded
+        for header in ([], [TranspositionTable.MAGIC, TranspositionTable.FORMAT_VERSION, TranspositionTable.KEY_LAYOUT - 1]):
+            with open(path, "wb") as f:
+                np.array(header, dtype=np.uint64).tofile(f)
+                entries.tofile(f)
+            assert not TranspositionTable.valid_file(path)
+            table = TranspositionTable(1 << 10, path=path)
+            assert table.probe(key) is None
+            table.close()
+            table = TranspositionTable(path=path)
+            assert table.probe(key) is None, "the discarded file is rewritten with the current header"
+            table.close()
+
+    print("Transposition table (round trip, bad check word, file header): OK")
+
+
+def check_opening_book():
+    """The book move of a position is mirrored for its reflection, with the binary search and with the dict."""
+    game = play([1, 3, 0])
+    key, flag = game.canonical_key()
+
+    # the record holds the move of the position with the canonical key
+    move = 2
+    records = np.array([(key, game.mirror_move(move) if flag else move)], dtype=OpeningBook.RECORD)
+
+    with tempfile.TemporaryDirectory() as book_dir:
+        path = os.path.join(book_dir, "book.bin")
+        OpeningBook(records).save(path)
+
+        for book in (OpeningBook.load(path), OpeningBook.load(path, mmap=False)):
+            assert book.lookup(game) == move, book.lookup(game)
+            assert book.lookup(mirrored(game)) == game.mirror_move(move), book.lookup(mirrored(game))
+            assert book.lookup(play([1, 3])) is None
+
+    # the positions of the book fold the reflections: the empty board with each starter, then 4 + 4 distinct first moves
+    assert len(book_positions(1)) == 2 + 2 * 4
+
+    print("Opening book (mirrored move, positions): OK")
+
+
+def check_canonical_key():
+    """A position and its left-right reflection share the canonical key, with opposite mirrored flags."""
+    for moves in ([0], [1, 5, 2], [3, 3, 0, 6, 1]):
+        game = play(moves)
+        key, flag = game.canonical_key()
+        mirror_key, mirror_flag = mirrored(game).canonical_key()
+        assert key == mirror_key, moves
+        assert flag != mirror_flag, moves
+        assert key == min(game.position_key(), game.position_key(mirrored=True)), moves
+
+    # a symmetric position is its own reflection
+    game = play([3, 3])
+    assert game.is_symmetric() and game.canonical_key() == (game.position_key(), False)
+
+    print("Canonical key (position and reflection): OK")
+
+
+def check_mcts_symmetry():
+    """
+    MCTS with the shared statistics of the mirrored positions chooses the same move as without them
+    on symmetric positions, and its tree follows a whole game.
+    """
+    empty = ConnectFour()
+    # X has 1, 2, 4, 5 on the bottom row: the center wins
+    winning = play([1, 1, 5, 5, 2, 2, 4, 4])
+
+    for game, rollouts in ((empty, 3000), (winning, 500)):
+        assert game.is_symmetric()
+        moves = []
+        for symmetry in (False, True):
+            random.seed(0)
+            mcts = MCTS(deepcopy(game), ai_player=game.to_play, symmetry=symmetry)
+            mcts.search_max_rollout(rollouts)
+            moves.append(mcts.best_move())
+        assert moves == [3, 3], moves
+
+    # the mirrored subtrees are re-attached when the opponent plays the move on the right
+    random.seed(1)
+    game = ConnectFour()
+    players = {player: MCTS(deepcopy(game), ai_player=player, symmetry=True) for player in (game.player1, game.player2)}
+    while not game.game_over():
+        mcts = players[game.to_play]
+        mcts.search_max_rollout(100)
+        move = mcts.best_move()
+        game.make_move(move, game.to_play)
+        for mcts in players.values():
+            mcts.move(move)
+            assert mcts.root_state.board == game.board
+
+    print("MCTS symmetry (best move on symmetric positions, whole game): OK")
+
+
+def check_threat_analysis():
+    """The threat analysis finds the immediate wins, the forced blocks and the moves under a winning cell of the opponent."""
+    # X has 1, 2, 4, 5 on the bottom row and O has them on the row above: the center wins for X, and would win for O next
+    game = play([1, 1, 5, 5, 2, 2, 4, 4])
+    analysis = game.threat_analysis()
+    assert analysis["wins"] == [3] and analysis["forced"] == [3] and analysis["unsafe"] == [3], analysis
+    assert MinMax(game).get_best_move_alphabeta(2, ai_player=game.to_play, threats=True) == 3
+
+    # O has three stones on column 6: X has to block
+    game = play([0, 6, 0, 6, 1, 6])
+    analysis = game.threat_analysis()
+    assert analysis["wins"] == [] and analysis["blocks"] == [6] and analysis["forced"] == [6], analysis
+    assert MinMax(game).get_best_move_alphabeta(2, ai_player=game.to_play, threats=True) == 6
+
+    # no threat: nothing is forced and all the moves are safe
+    analysis = play([3, 3, 2, 2]).threat_analysis()
+    assert analysis["forced"] == [] and analysis["safe"] == list(range(7)), analysis
+
+    print("Threat analysis (wins, blocks, unsafe moves): OK")
+
+
+def check_threat_table_key():
+    """
+    The searches with other threat settings don't share the entries of the transposition table: a table filled by
+    a plain search gives the same moves as an empty one to the searches with threat extension and analysis.
+    """
+    game = play([3, 2, 3, 4, 2])
+    minmax = MinMax(game)
+    keys = set()
+    for threats, threat_extension in ((False, 0), (True, 0), (False, 4), (True, 4)):
+        minmax.threats, minmax.threat_extension = threats, threat_extension
+        keys.add(minmax.table_key(game.to_play, game.to_play, True)[0])
+    assert len(keys) == 4 and max(keys) < 1 << 64, keys
+
+    random.seed(5)
+    for _ in range(4):
+        game = ConnectFour()
+        for _ in range(8):
+            game.make_move(random.choice(game.available_moves()), game.to_play)
+
+        table = TranspositionTable(1 << 16)
+        MinMax(game, transposition_table=table).get_best_move_alphabeta(3, ai_player=game.to_play)
+        warm = MinMax(game, transposition_table=table).get_best_move_alphabeta(3, ai_player=game.to_play, threats=True,
+                                                                               threat_extension=4)
+        cold = MinMax(game, transposition_table=TranspositionTable(1 << 16)).get_best_move_alphabeta(
+            3, ai_player=game.to_play, threats=True, threat_extension=4)
+        assert warm == cold, (game.board, warm, cold)
+
+    print("Transposition table keys of the threat settings: OK")
+
+
+if __name__ == "__main__":
+    check_transposition_table()
+    check_opening_book()
+    check_canonical_key()
+    check_mcts_symmetry()
+    check_threat_analysis()
+    check_threat_table_key()
+    print("All checks passed")
@@ -0,0 +1,248 @@
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+from tournament import build_pairing, game_seed, player_name, run_game, run_tournament
+
+# Ratings of the engine configurations, from the games of the tournament runner (see tournament.py):
+# - Elo of each player with confidence intervals, fitting a Bradley-Terry model on a round-robin tournament
+# - sequential probability ratio test (SPRT) between two players, which stops the match as soon as it is decided
+
+Z_95 = 1.959964  # quantile of the normal distribution for 95% confidence intervals
+
+
+def elo_to_score(elo):
+    """Expected score of a player with elo points of advantage."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    """Elo difference corresponding to an expected score (clamped away from 0 and 1)."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def match_elo(wins, draws, losses):
+    """
+    Elo difference of a player from its wins, draws and losses against an opponent, with its 95% confidence interval
+    (Wilson score interval of the mean score of a game, with the variance of the wins, draws and losses).
+    Unlike the interval of the standard error, it does not collapse to a point when the player wins, draws
+    or loses every game.
+    Returns (elo, elo_low, elo_high).
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, -math.inf, math.inf
+
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+
+    z2 = Z_95 ** 2 / games
+    center = (score + z2 / 2) / (1 + z2)
+    margin = Z_95 * math.sqrt(variance / games + z2 / (4 * games)) / (1 + z2)
+
+    return score_to_elo(score), score_to_elo(center - margin), score_to_elo(center + margin)
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    Log-likelihood ratio of H1 (elo = elo1) against H0 (elo = elo0), from the wins, draws and losses of a player,
+    with the normal approximation of the mean score of a game and the observed variance of the score.
+    When all the games have the same result the observed variance is 0: the variance of a game without draws
+    at the midpoint of the expected scores of the hypotheses is used instead.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+
+    score = (wins + 0.5 * draws) / games
+
+    score0, score1 = elo_to_score(elo0), elo_to_score(elo1)
+
+    # with a variance of 0 (e.g. a player winning every game) the ratio would be infinite after the first game
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance == 0:
+        midpoint = (score0 + score1) / 2
+        variance = midpoint * (1 - midpoint)
+
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def sprt_bounds(alpha, beta):
+    """Bounds of the log-likelihood ratio: below the lower one H0 is accepted, above the upper one H1 is accepted."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def run_sprt(player_a, player_b, elo0=0, elo1=50, alpha=0.05, beta=0.05, max_games=2000, base_seed=0, max_workers=None):
+    """
+    Play games between player_a and player_b over a process pool until the SPRT decides whether player_a
+    is stronger than player_b by elo1 (H1) or by at most elo0 (H0), or max_games are played.
+    Returns a dict with the decision ("H1", "H0" or None), the log-likelihood ratio, the wins, draws and
+    losses of player_a and its Elo difference with the confidence interval.
+    The test is checked only on the games 0..n-1 with no gap: the games finished out of order wait for the earlier
+    ones, otherwise the short games (e.g. quick wins) would be counted first and bias the early stopping.
+    - player_a, player_b: specs of the players (see tournament.py)
+    - elo0, elo1: Elo differences of the two hypotheses
+    - alpha, beta: max probabilities of accepting H1 when H0 is true and vice versa
+    - max_games: max number of games of the match
+    - base_seed: base seed from which the seed of each game is derived
+    - max_workers: number of worker processes (None to use all the cores)
+    """
+    config = build_pairing(player_a, player_b)
+    lower, upper = sprt_bounds(alpha, beta)
+
+    wins = draws = losses = 0
+    llr = 0.0
+    decision = None
+
+    max_workers = max_workers or os.cpu_count()
+    next_game = 0
+    finished = {}   # winners of the games finished out of order, by game index
+    counted = 0     # games 0..counted-1 are counted in the test
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        # keep all the workers busy, checking the test after each finished game
+        pending = set()
+        indices = {}
+        while decision is None and (pending or next_game < max_games):
+
+            while len(pending) < max_workers and next_game < max_games:
+                seed = game_seed(base_seed, config["config"], next_game)
+                future = executor.submit(run_game, config, next_game, seed)
+                indices[future] = next_game
+                pending.add(future)
+                next_game += 1
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                finished[indices.pop(future)] = future.result()["winner"]
+
+            # count the games in index order, up to the first one still running
+            while counted in finished:
+                winner = finished.pop(counted)
+                wins += winner == "one"
+                losses += winner == "two"
+                draws += winner == "draw"
+                counted += 1
+
+            llr = sprt_llr(wins, draws, losses, elo0, elo1)
+            if llr >= upper:
+                decision = "H1"
+            elif llr <= lower:
+                decision = "H0"
+
+    finally:
+        # the games still running are not needed anymore: return without waiting for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elo, elo_low, elo_high = match_elo(wins, draws, losses)
+
+    return {
+        "config": config["config"],
+        "decision": decision,
+        "llr": llr,
+        "bounds": (lower, upper),
+        "games": wins + draws + losses,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "elo": elo,
+        "elo_ci": (elo_low, elo_high)
+    }
+
+
+def bradley_terry(names, records, prior_draws=1, iterations=1000, tolerance=1e-9):
+    """
+    Fit the Bradley-Terry model on the games between the players, returning the Elo of each player
+    (with mean 0) and its 95% confidence interval, as a dict name -> (elo, elo_low, elo_high).
+    A draw counts as half a win for each player. prior_draws virtual draws are added to each pairing that
+    was played, so that players who always win or always lose still have a finite rating.
+    - names: names of the players
+    - records: list of (name_one, name_two, winner) with winner "one", "two" or "draw"
+    """
+    n = len(names)
+    index = {name: i for i, name in enumerate(names)}
+
+    wins = np.zeros((n, n))   # wins[i, j]: (half) wins of i against j
+    for name_one, name_two, winner in records:
+        i, j = index[name_one], index[name_two]
+        if winner == "one":
+            wins[i, j] += 1
+        elif winner == "two":
+            wins[j, i] += 1
+        else:
+            wins[i, j] += 0.5
+            wins[j, i] += 0.5
+
+    played = (wins + wins.T) > 0
+    wins += 0.5 * prior_draws * played
+    games = wins + wins.T
+
+    # minorization-maximization iterations on the strengths
+    strength = np.ones(n)
+    for _ in range(iterations):
+        denominator = (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        new_strength = np.where(denominator > 0, wins.sum(axis=1) / np.maximum(denominator, 1e-300), 1.0)
+        new_strength /= np.exp(np.mean(np.log(new_strength)))
+        converged = np.max(np.abs(new_strength - strength)) < tolerance
+        strength = new_strength
+        if converged:
+            break
+
+    theta = np.log(strength)
+
+    # covariance of the log-strengths from the Fisher information (pseudo-inverse for the mean-zero constraint)
+    p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+    information = -games * p * (1 - p)
+    np.fill_diagonal(information, 0)
+    np.fill_diagonal(information, -information.sum(axis=1))
+    covariance = np.linalg.pinv(information)
+
+    scale = 400 / math.log(10)
+    elo = theta * scale
+    margin = Z_95 * np.sqrt(np.maximum(np.diag(covariance), 0)) * scale
+
+    return {name: (float(elo[i]), float(elo[i] - margin[i]), float(elo[i] + margin[i])) for name, i in index.items()}
+
+
+def run_rating(players, num_games, results_path, base_seed=0, max_workers=None):
+    """
+    Play a round-robin tournament among the players (num_games games for each pair, see tournament.run_tournament)
+    and return their ratings (see bradley_terry), sorted from the strongest.
+    - players: specs of the players (see tournament.py)
+    """
+    configs = [build_pairing(players[i], players[j]) for i in range(len(players)) for j in range(i + 1, len(players))]
+    results = run_tournament(configs, num_games, results_path, base_seed, max_workers)
+
+    keys = {config["config"]: config for config in configs}
+    records = [(player_name(keys[key]["player_one"]), player_name(keys[key]["player_two"]), record["winner"])
+               for (key, _), record in results.items() if key in keys]
+
+    ratings = bradley_terry([player_name(player) for player in players], records)
+    return sorted(ratings.items(), key=lambda item: item[1][0], reverse=True)
+
+
+if __name__ == "__main__":
+
+    PLAYERS = [
+        {"engine": "minmax", "depth": 2},
+        {"engine": "minmax", "depth": 4},
+        {"engine": "minmax", "depth": 4, "heuristic": False},
+        {"engine": "mcts", "rollouts": 1000},
+        {"engine": "mcts", "time_limit": 1},
+    ]
+    NUM_GAMES = 20
+    RESULTS_PATH = "rating_results.jsonl"  # delete it to start a new rating from scratch
+
+    print("======== Rating (round-robin, Bradley-Terry Elo) ========")
+    for rank, (name, (elo, elo_low, elo_high)) in enumerate(run_rating(PLAYERS, NUM_GAMES, RESULTS_PATH), start=1):
+        print(f"{rank}. {name}: {elo:+.0f} Elo (95% CI {elo_low:+.0f} .. {elo_high:+.0f})")
+
+    print("\n======== SPRT: mcts(r=2000) vs mcts(r=1000), H0: 0 Elo, H1: +50 Elo ========")
+    result = run_sprt({"engine": "mcts", "rollouts": 2000}, {"engine": "mcts", "rollouts": 1000}, elo0=0, elo1=50)
+    print(f"Decision: {result['decision']} after {result['games']} games (LLR {result['llr']:.2f}, "
+          f"bounds {result['bounds'][0]:.2f} .. {result['bounds'][1]:.2f})")
+    print(f"W/D/L: {result['wins']}/{result['draws']}/{result['losses']}. "
+          f"Elo: {result['elo']:+.0f} (95% CI {result['elo_ci'][0]:+.0f} .. {result['elo_ci'][1]:+.0f})")
@@ -3,6 +3,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from genetic_algorithm import * 
+from genetic_algorithm import ITEMS, KNAPSACK_CAPACITY  # default instance, loaded lazily
 
 n = int(input("Number of runs: "))
 
@@ -16,6 +17,10 @@ selection_method_name = "Roulette"
 crossover_rate = 0.6
 max_gens = 600
 tournament_k = 0
+representation = "list"   # "list" or "numpy"
+repair = False            # repair the overweight offsprings and fill them greedily
+initialization = "random" # "random" or "greedy"
+generation_gap = 1.0      # fraction of the population replaced at each generation (< 1 for the steady-state mode)
 
 for i in range(n):
     print(f"\n----------------------Iteration {i+1}/{n}----------------------")
@@ -27,13 +32,18 @@ for i in range(n):
                 mutation_rate=mutation_rate,
                 selection_method=selection_method_name,
                 crossover_rate=crossover_rate,
-                tournament_k=tournament_k)
+                tournament_k=tournament_k,
+                representation=representation,
+                repair=repair,
+                initialization=initialization,
+                generation_gap=generation_gap)
     
     start = time.time()
     fitness_history, best_fitness = gen_alg.run_experiment_config(max_gens, plot=False)
     end = time.time()
 
     print(f"Best fitness : {best_fitness}")
+    print(f"Generations : {gen_alg.generation} (stop reason: {gen_alg.stop_reason})")
     print(f"Time : {(end-start):.4f}s")
 
     times.append(end-start)
@@ -0,0 +1,407 @@
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from branch_and_bound import BranchAndBound
+from genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm_grid_search import build_configs, run_grid_search, summarize_results
+from island_model import IslandModel
+from knapsack_instance import load_instance
+
+# Quick checks of the knapsack solvers (branch and bound and genetic algorithm), run as a script:
+# each check prints its result and an AssertionError stops the script at the first failure.
+
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instances", "knapsack_500.csv")
+OPTIMAL_VALUE = 7117
+
+# small genetic algorithm, quick to run on the 500 items instance
+GA_PARAMETERS = {"population_size": 40, "mutation_rate": 0.01, "selection_method": "Tournament", "crossover_rate": 0.9,
+                 "tournament_k": 3}
+
+
+def path_totals(items, path):
+    """Return the total weight and the total value of the items taken by the path."""
+    return sum(w for (w, _), x in zip(items, path) if x), sum(v for (_, v), x in zip(items, path) if x)
+
+
+def check_branch_and_bound_core():
+    """The core branch and bound reaches the optimum of the 500 items instance, also when it takes no item of the core."""
+    instance = load_instance(INSTANCE_PATH)
+
+    best_value, best_path, _, _ = BranchAndBound.from_instance(instance).solve_knapsack_core()
+    weight, value = path_totals(instance.items, best_path)
+    assert best_value == value == OPTIMAL_VALUE, f"core: {best_value} instead of {OPTIMAL_VALUE}"
+    assert weight <= instance.capacity
+
+    # the optimum of the core is empty: no item fits, or the core only holds an item which is left out
+    for items, capacity, core_size in (([(10, 2)], 3, 50), ([(2, 3), (3, 4), (4, 5), (5, 6)], 5, 1)):
+        best_value, best_path, _, _ = BranchAndBound(items, capacity).solve_knapsack_core(core_size)
+        weight, value = path_totals(items, best_path)
+        assert best_value == value == BranchAndBound(items, capacity).solve_knapsack()[0], (items, best_value)
+        assert len(best_path) == len(items) and weight <= capacity, best_path
+
+    print(f"Branch and bound core: {OPTIMAL_VALUE} OK, empty core optimum OK")
+
+
+def check_branch_and_bound_parallel():
+    """The parallel branch and bound reaches the optimum of the 500 items instance, like the sequential search."""
+    instance = load_instance(INSTANCE_PATH)
+
+    best_value, best_path, _, _ = BranchAndBound.from_instance(instance).solve_knapsack_parallel(split_depth=3, max_workers=2)
+    weight, value = path_totals(instance.items, best_path)
+    assert best_value == value == OPTIMAL_VALUE, f"parallel: {best_value} instead of {OPTIMAL_VALUE}"
+    assert weight <= instance.capacity
+
+    # small instance: the frontier is deeper than the tree
+    items = [(2, 3), (3, 4), (4, 5), (5, 6)]
+    assert BranchAndBound(items, 5).solve_knapsack_parallel(split_depth=6, max_workers=2)[0] == 7
+
+    print(f"Branch and bound parallel: {OPTIMAL_VALUE} OK")
+
+
+def ga_with_fitness(fitness_scores, **kwargs):
+    """Return a genetic algorithm on the default items whose population has the given fitness scores."""
+    instance = load_instance(INSTANCE_PATH)
+    gen_alg = GeneticAlgorithm.from_instance(instance, **{**GA_PARAMETERS, "seed": 3, **kwargs})
+    gen_alg.population = [[0] * len(instance) for _ in fitness_scores]
+    gen_alg.fitness_scores = list(fitness_scores)
+    return gen_alg
+
+
+def check_tournament_selection():
+    """The batched tournament picks, for each parent, the fittest of a row of k random competitors."""
+    fitness_scores = [(i * 37) % 101 for i in range(100)]
+    gen_alg = ga_with_fitness(fitness_scores, tournament_k=4)
+
+    # the same generator draws the same competitors
+    competitors = np.random.default_rng(3).integers(0, len(fitness_scores), (500, 4))
+    parents = gen_alg.parent_indices(500)
+    assert parents == [max(row, key=lambda i: fitness_scores[i]) for row in competitors.tolist()]
+
+    # with k = 1 there is no selection pressure, with a larger k the parents are fitter
+    mean_fitness = {k: np.mean([fitness_scores[i] for i in ga_with_fitness(fitness_scores, tournament_k=k).parent_indices(2000)])
+                    for k in (1, 2, 8)}
+    assert mean_fitness[1] < mean_fitness[2] < mean_fitness[8], mean_fitness
+
+    print("Tournament selection (batched winners, selection pressure): OK")
+
+
+def check_fitness_history():
+    """
+    The fitness history of a run is a compact array streamed to its file, without a per-generation list of records,
+    and the plots are written to files without loading pyplot.
+    """
+    instance = load_instance(INSTANCE_PATH)
+
+    with tempfile.TemporaryDirectory() as history_dir:
+        history_path = os.path.join(history_dir, "history.bin")
+        gen_alg = GeneticAlgorithm.from_instance(instance, history_path=history_path, seed=1, **GA_PARAMETERS)
+        history, best_fitness = gen_alg.run_experiment_config(30)
+
+        assert len(history) == 30 and history == sorted(history) and history[-1] <= best_fitness
+        assert np.fromfile(history_path, dtype=np.int64).tolist() == history
+        assert not hasattr(gen_alg, "history")
+
+        plot_path = os.path.join(history_dir, "history.png")
+        gen_alg.run_experiment_config(5, plot=plot_path)
+        assert os.path.getsize(plot_path) > 0
+        assert "matplotlib.pyplot" not in sys.modules
+
+    print("Fitness history (array streamed to file, headless plot): OK")
+
+
+def check_numpy_representation():
+    """The fitness of the population matrix is the fitness of each individual, and a run keeps a feasible best solution."""
+    instance = load_instance(INSTANCE_PATH)
+    gen_alg = GeneticAlgorithm.from_instance(instance, representation="numpy", seed=2, **GA_PARAMETERS)
+
+    gen_alg.start_run()
+    population = gen_alg.population
+    assert population.shape == (GA_PARAMETERS["population_size"], len(instance)) and population.dtype == np.uint8
+    for individual, fitness in zip(population.tolist(), gen_alg.calculate_fitness_matrix(population).tolist()):
+        weight, value = path_totals(instance.items, individual)
+        assert fitness == (value if weight <= instance.capacity else 0)
+
+    history, best_fitness = gen_alg.run_experiment_config(30)
+    weight, value = path_totals(instance.items, gen_alg.best_solution)
+    assert value == best_fitness and history[-1] <= best_fitness
+    assert weight <= instance.capacity and 0 < best_fitness <= OPTIMAL_VALUE
+
+    print("Numpy representation (matrix fitness, feasible best): OK")
+
+
+def check_bitset_representation():
+    """The bitset fitness and the list conversions agree with the list representation on random individuals."""
+    instance = load_instance(INSTANCE_PATH)
+    bitset = GeneticAlgorithm.from_instance(instance, representation="bitset", seed=4, **GA_PARAMETERS)
+    listed = GeneticAlgorithm.from_instance(instance, representation="list", seed=4, **GA_PARAMETERS)
+
+    rng = np.random.default_rng(4)
+    for density in (0.01, 0.05, 0.5):
+        genes = (rng.random(len(instance)) < density).astype(int).tolist()
+        individual = bitset.list_to_individual(genes)
+        assert isinstance(individual, int) and bitset.bitset_to_list(individual) == genes
+        assert bitset.calculate_fitness(individual) == listed.calculate_fitness(genes)
+
+    history, best_fitness = bitset.run_experiment_config(30)
+    weight, value = path_totals(instance.items, bitset.best_solution)
+    assert value == best_fitness and weight <= instance.capacity
+
+    print("Bitset representation (fitness, conversions): OK")
+
+
+def check_fitness_cache():
+    """The fitness cache doesn't change a run, stays within its size, and is rejected where it would not be used."""
+    instance = load_instance(INSTANCE_PATH)
+
+    for representation in ("list", "bitset"):
+        plain = GeneticAlgorithm.from_instance(instance, representation=representation, seed=5, **GA_PARAMETERS)
+        cached = GeneticAlgorithm.from_instance(instance, representation=representation, seed=5, fitness_cache_size=100,
+                                                **GA_PARAMETERS)
+        assert plain.run_experiment_config(40) == cached.run_experiment_config(40)
+        assert cached.cache_hits > 0 and len(cached.fitness_cache) <= 100, (cached.cache_hits, len(cached.fitness_cache))
+
+    for kwargs in ({"representation": "numpy"}, {"incremental_fitness": True}):
+        try:
+            GeneticAlgorithm.from_instance(instance, fitness_cache_size=100, **kwargs, **GA_PARAMETERS)
+        except ValueError:
+            continue
+        raise AssertionError(f"the fitness cache is accepted with {kwargs}")
+
+    print("Fitness cache (same runs, bounded size, rejected settings): OK")
+
+
+def check_incremental_fitness():
+    """The totals updated incrementally by crossover and mutation match the totals recomputed from the genes."""
+    instance = load_instance(INSTANCE_PATH)
+
+    for kwargs in ({}, {"repair": True}, {"generation_gap": 0.2}):
+        gen_alg = GeneticAlgorithm.from_instance(instance, incremental_fitness=True, seed=6, **kwargs, **GA_PARAMETERS)
+        history, best_fitness = gen_alg.run_experiment_config(40)
+
+        for individual, totals, fitness in zip(gen_alg.population, gen_alg.totals, gen_alg.fitness_scores):
+            assert tuple(totals) == path_totals(instance.items, individual), kwargs
+            assert fitness == gen_alg.calculate_fitness(individual), kwargs
+        assert path_totals(instance.items, gen_alg.best_solution)[1] == best_fitness
+
+    print("Incremental fitness (totals of crossover and mutation): OK")
+
+
+def check_roulette_selection():
+    """The roulette picks the individuals in proportion to their fitness, and at random when the fitness is all 0."""
+    fitness_scores = [0, 10, 0, 30, 60]
+    gen_alg = ga_with_fitness(fitness_scores, selection_method="Roulette")
+
+    parents = gen_alg.parent_indices(20000)
+    frequencies = np.bincount(parents, minlength=len(fitness_scores)) / len(parents)
+    assert frequencies[0] == frequencies[2] == 0, frequencies
+    assert np.allclose(frequencies, np.array(fitness_scores) / sum(fitness_scores), atol=0.02), frequencies
+
+    parents = ga_with_fitness([0] * 5, selection_method="Roulette").parent_indices(1000)
+    assert set(parents) == set(range(5))
+
+    print("Roulette selection (proportional picks): OK")
+
+
+def check_island_model():
+    """The islands evolve in worker processes with migrations, and the best solution of all the islands is feasible."""
+    instance = load_instance(INSTANCE_PATH)
+    island_configs = [dict(GA_PARAMETERS, selection_method=selection, representation=representation)
+                      for selection, representation in (("Tournament", "list"), ("Roulette", "numpy"), ("Tournament", "bitset"))]
+
+    model = IslandModel(instance.items, instance.capacity, island_configs, migration_interval=10, num_migrants=2, seed=7)
+    best_fitness, best_solution, histories = model.run(30, max_workers=2)
+
+    weight, value = path_totals(instance.items, best_solution)
+    assert value == best_fitness and weight <= instance.capacity
+    assert [len(history) for history in histories] == [30] * 3
+    assert best_fitness >= max(history[-1] for history in histories)
+
+    print("Island model (migrations across representations, feasible best): OK")
+
+
+def check_grid_search():
+    """The grid search resumes from the missing runs, reruns the runs stored with other settings, and is reproducible."""
+    grid_parameters = {"pop_size": [20], "mutation_rate": [0.01], "crossover_rate": [0.9],
+                       "selection_method": ["Roulette", "Tournament"], "tournament_k": [3]}
+    configs = build_configs(grid_parameters)
+    assert [config["tournament_k"] for config in configs] == [None, 3]
+
+    with tempfile.TemporaryDirectory() as results_dir:
+        results_path = os.path.join(results_dir, "results.jsonl")
+
+        results = run_grid_search(configs, 2, 10, results_path, base_seed=1, max_workers=2)
+        assert len(results) == 4 and all(len(record["history"]) == 10 for record in results.values())
+
+        # resumed with the same settings: the stored runs are returned as they are
+        with open(results_path, "r", encoding="utf-8") as f:
+            num_lines = len(f.readlines())
+        assert run_grid_search(configs, 2, 10, results_path, base_seed=1, max_workers=2) == results
+        with open(results_path, "r", encoding="utf-8") as f:
+            assert len(f.readlines()) == num_lines
+
+        # another generation budget: the runs are performed again, from the same seeds
+        rerun = run_grid_search(configs, 2, 12, results_path, base_seed=1, max_workers=2)
+        assert all(len(record["history"]) == 12 and record["seed"] == results[key]["seed"] for key, record in rerun.items())
+        assert all(rerun[key]["history"][:10] == results[key]["history"] for key in results)
+
+        summary = summarize_results(rerun, configs, 2)
+        assert len(summary) == 2 and summary[0]["score"] >= summary[1]["score"]
+
+    print("Grid search (resume, stale settings, reproducible runs): OK")
+
+
+def check_early_stopping():
+    """Each stopping criterion ends the run with its reason, and evolve continues a run from where it stopped."""
+    instance = load_instance(INSTANCE_PATH)
+
+    def run(**criteria):
+        gen_alg = GeneticAlgorithm.from_instance(instance, seed=8, repair=True, **GA_PARAMETERS)
+        history, best_fitness = gen_alg.run_experiment_config(500, **criteria)
+        return gen_alg, history, best_fitness
+
+    gen_alg, history, best_fitness = run(target_fitness=OPTIMAL_VALUE)
+    assert gen_alg.stop_reason == "target_fitness" and best_fitness == OPTIMAL_VALUE and 0 < len(history) < 500
+    assert history[-1] < OPTIMAL_VALUE, "the run stops as soon as the target is reached"
+
+    gen_alg, history, _ = run(stagnation_window=5)
+    assert gen_alg.stop_reason == "stagnation" and history[-5:] == [history[-1]] * 5, history[-6:]
+
+    assert run(time_budget=0)[0].stop_reason == "time_budget"
+    assert run(min_diversity=1.1)[0].stop_reason == "diversity"
+    assert run()[0].stop_reason == "max_generation"
+
+    # a run can be evolved a few generations at a time
+    gen_alg = GeneticAlgorithm.from_instance(instance, seed=8, **GA_PARAMETERS)
+    gen_alg.start_run()
+    gen_alg.evolve(10)
+    gen_alg.evolve(15)
+    gen_alg.finish_run()
+    assert gen_alg.generation == len(gen_alg.fitness_history) == 25
+
+    print("Early stopping (reasons, continued runs): OK")
+
+
+def check_repair():
+    """The repair makes every individual feasible in all the representations, and the greedy initialization is feasible."""
+    instance = load_instance(INSTANCE_PATH)
+    rng = np.random.default_rng(9)
+
+    for representation in ("list", "bitset", "numpy"):
+        gen_alg = GeneticAlgorithm.from_instance(instance, representation=representation, repair=True, seed=9,
+                                                 **GA_PARAMETERS)
+
+        # overweight individuals, repaired one at a time (or as a matrix)
+        genes = (rng.random((5, len(instance))) < 0.5).astype(np.uint8)
+        if representation == "numpy":
+            repaired = gen_alg.repair_matrix(genes.copy()).tolist()
+        else:
+            repaired = [gen_alg.individual_to_list(gen_alg.repair_individual(gen_alg.list_to_individual(row)))
+                        for row in genes.tolist()]
+        for row in repaired:
+            weight, value = path_totals(instance.items, row)
+            assert weight <= instance.capacity and instance.capacity - weight < min(instance.weights.tolist()) + 60, weight
+
+        greedy = GeneticAlgorithm.from_instance(instance, representation=representation, initialization="greedy", seed=9,
+                                                **GA_PARAMETERS)
+        greedy.start_run()
+        population = greedy.population.tolist() if representation == "numpy" else \
+                     [greedy.individual_to_list(individual) for individual in greedy.population]
+        assert all(path_totals(instance.items, row)[0] <= instance.capacity for row in population)
+        assert greedy.best_global_fitness > 0.9 * OPTIMAL_VALUE, greedy.best_global_fitness
+
+    print("Repair and greedy initialization (feasible individuals): OK")
+
+
+def check_steady_state():
+    """The steady-state generations update the population in place and never lose the best individual."""
+    instance = load_instance(INSTANCE_PATH)
+
+    for representation in ("list", "bitset", "numpy"):
+        gen_alg = GeneticAlgorithm.from_instance(instance, representation=representation, generation_gap=0.25, seed=5,
+                                                 **GA_PARAMETERS)
+        gen_alg.start_run()
+        population = gen_alg.population
+        best = gen_alg.best_global_fitness
+
+        gen_alg.evolve(30)
+        assert gen_alg.population is population and len(population) == GA_PARAMETERS["population_size"]
+        history = list(gen_alg.fitness_history)
+        assert history == sorted(history) and gen_alg.best_global_fitness >= best
+
+        # the fitness stays in sync with the individuals written in place
+        expected = [gen_alg.cached_fitness(gen_alg.list_to_individual(gen_alg.individual_to_list(individual)))
+                    for individual in population]
+        assert expected == [int(score) for score in gen_alg.fitness_scores]
+
+    for generation_gap in (0, 1.5):
+        try:
+            GeneticAlgorithm.from_instance(instance, generation_gap=generation_gap, **GA_PARAMETERS)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"generation_gap={generation_gap} accepted")
+
+    print("Steady-state generations (in place, elitist): OK")
+
+
+def check_instance_loading():
+    """The three formats of instance files are parsed, and the binary cache is memory-mapped and rebuilt on changes."""
+    items = [(4, 6), (3, 5), (2, 3), (5, 7)]
+    capacity = 9
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "simple": "4 9\n" + "".join(f"{value} {weight}\n" for weight, value in items),
+            "pisinger": "small\nn 4\nc 9\nz 14\ntime 0.00\n"
+                        + "".join(f"{i + 1},{value},{weight},0\n" for i, (weight, value) in enumerate(items)) + "-----\n",
+            "orlib": "1\n4 1 14\n" + " ".join(str(value) for _, value in items) + "\n"
+                     + " ".join(str(weight) for weight, _ in items) + "\n9\n",
+        }
+        for fmt, text in files.items():
+            path = os.path.join(tmp, f"{fmt}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+            instance = load_instance(path)
+            assert (instance.items, instance.capacity) == (items, capacity), (fmt, instance.items)
+            assert instance.optimum == (None if fmt == "simple" else 14), (fmt, instance.optimum)
+
+        # the cache is memory-mapped on the second load, and rebuilt when the source file changes
+        path = os.path.join(tmp, "simple.txt")
+        cache_dir = os.path.join(tmp, "cache")
+        load_instance(path, cache_dir=cache_dir)
+        cached = load_instance(path, cache_dir=cache_dir)
+        assert isinstance(cached.weights, np.memmap) and cached.items == items
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("4 10\n" + "".join(f"{value} {weight}\n" for weight, value in items))
+        os.utime(path, (0, 0))
+        instance = load_instance(path, cache_dir=cache_dir)
+        assert instance.capacity == 10
+
+        # the core solver works on the arrays, without building the list of items
+        solver = BranchAndBound.from_instance(instance)
+        assert solver.solve_knapsack_core()[0] == 15 and solver._items is None and instance._items is None
+
+    print("Instance loading (formats, binary cache): OK")
+
+
+if __name__ == "__main__":
+    check_branch_and_bound_parallel()
+    check_branch_and_bound_core()
+    check_tournament_selection()
+    check_fitness_history()
+    check_numpy_representation()
+    check_bitset_representation()
+    check_fitness_cache()
+    check_incremental_fitness()
+    check_roulette_selection()
+    check_island_model()
+    check_grid_search()
+    check_early_stopping()
+    check_repair()
+    check_steady_state()
+    check_instance_loading()
+    print("All checks passed")
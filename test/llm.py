@@ -1,11 +1,28 @@
-import requests
+import asyncio
+import copy
+import hashlib
 import json
+import math
+import os
+import random
 import re
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
 
 # PLACE YOUR API KEY HERE : https://openrouter.ai/
 OPENROUTER_API_KEY = ""
 
+# base URL of the chat completions API, it can point to a local stand-in server for the tests
+OPENROUTER_BASE_URL = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# on-disk cache of the LLM move responses (empty LLM_CACHE_DIR to disable it), see LLMCache
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", ".llm_cache")
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 30 * 24 * 3600))  # seconds
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 100 * 2**20))
+
 OPENROUTER_MODELS = {
     "claude": "anthropic/claude-3.7-sonnet:thinking",
     "openai": "openai/o4-mini-high",
@@ -19,6 +36,248 @@ MODEL_PRICES_MTOK = {
 }
 
 
+class LLMClient:
+    """
+    Client of the chat completions API, with a persistent session: the connections (and their TLS handshakes)
+    are kept in a pool and reused by the next requests, also by concurrent requests from different threads.
+    """
+
+    def __init__(self, base_url=None, api_key=None, timeout=60, pool_size=16):
+        """
+        - base_url: base URL of the API (None for OPENROUTER_BASE_URL)
+        - api_key: API key (None for OPENROUTER_API_KEY)
+        - timeout: timeout of each request, in seconds
+        - pool_size: max number of connections kept open, i.e. of concurrent requests without waiting for a connection
+        """
+        self.base_url = (base_url or OPENROUTER_BASE_URL).rstrip("/")
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key if api_key is not None else OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost",
+            "X-Title": "My Local Test",
+        })
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+
+    def chat(self, model_key, messages):
+        """
+        Send a chat completion request and return the JSON response.
+        - model_key: key to the model to invoke (OPENROUTER_MODELS)
+        - messages: list of messages, each one a dict with role and content
+        """
+        payload = {
+            "model": OPENROUTER_MODELS[model_key],
+            "messages": messages
+        }
+
+        response = self.session.post(f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout)
+
+        response.raise_for_status()
+        return response.json()
+
+
+    async def chat_async(self, model_key, messages):
+        """Asyncio variant of chat: the request runs in a worker thread, so that many requests can be awaited concurrently."""
+        return await asyncio.to_thread(self.chat, model_key, messages)
+
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+
+default_client = None
+default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the client shared by all the calls of this module, created on first use."""
+    global default_client
+
+    with default_client_lock:
+        if default_client is None:
+            default_client = LLMClient()
+        return default_client
+
+
+class LLMCache:
+    """
+    On-disk, content-addressed cache of the LLM responses: each response is stored in a JSON file named after
+    the sha256 of the request (model, system prompt and user prompt with the board), together with the cost and
+    the latency of the original request. Entries expire after ttl seconds, and the least recently used ones are
+    evicted when the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir, ttl=None, max_bytes=None):
+        """
+        - cache_dir: directory of the cache
+        - ttl: seconds after which an entry expires (None for no expiration)
+        - max_bytes: max size of the cache on disk (None for no limit)
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.lock = threading.Lock()
+        self.index = None  # key -> [last use, size] of the entries on disk, loaded by the first put
+
+        # statistics: requests answered by the cache, requests sent to the LLM, cost and time saved by the hits
+        self.hits = 0
+        self.misses = 0
+        self.saved_cost = 0
+        self.saved_time = 0
+
+
+    @staticmethod
+    def key(model, system_prompt, prompt):
+        """Return the content address of a request."""
+        return hashlib.sha256(json.dumps([model, system_prompt, prompt]).encode()).hexdigest()
+
+
+    def path(self, key):
+        """Path of the file of an entry (sharded by the first two hex digits of the key)."""
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+
+    def get(self, key):
+        """Return the entry of the key, or None if missing or expired (counted as a miss)."""
+        path = self.path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            self.remove(key)
+            entry = None
+
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.saved_cost += entry["cost"]
+            self.saved_time += entry["latency"]
+
+            # the modification time is the last use of the entry, for the eviction
+            now = time.time()
+            if self.index is not None and key in self.index:
+                self.index[key][0] = now
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+
+        return entry
+
+
+    def put(self, key, response, cost, latency):
+        """
+        Store the response of a request, with its cost and latency, evicting the least recently used entries
+        if the cache exceeds max_bytes.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        entry = {"created": time.time(), "cost": cost, "latency": latency, "response": response}
+
+        # write to a temporary file and rename it, so that a reader never sees a partial entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.index is None:
+                self.load_index()
+            self.index[key] = [time.time(), os.path.getsize(path)]
+            self.evict()
+
+
+    def remove(self, key):
+        """Delete the entry of the key."""
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+        with self.lock:
+            if self.index is not None:
+                self.index.pop(key, None)
+
+
+    def load_index(self):
+        """Scan the cache directory, collecting the last use and the size of each entry."""
+        self.index = {}
+
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    self.index[entry.name[:-len(".json")]] = [stat.st_mtime, stat.st_size]
+
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return
+
+        total = sum(size for _, size in self.index.values())
+        if total <= self.max_bytes:
+            return
+
+        for key in sorted(self.index, key=lambda key: self.index[key][0]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)[1]
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+
+default_cache = None
+default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the cache of the LLM move responses shared by all the calls of this module (None if disabled)."""
+    global default_cache
+
+    with default_cache_lock:
+        if default_cache is None and LLM_CACHE_DIR:
+            default_cache = LLMCache(LLM_CACHE_DIR, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+        return default_cache
+
+
+def llm_cost(model_key, data):
+    """
+    Return the cost in $ of an LLM response, from its token usage.
+    - model_key: key to the invoked model (MODEL_PRICES_MTOK)
+    - data: JSON response of the LLM
+    """
+    usage = data.get("usage", {})
+    input_tok = usage.get("prompt_tokens", 0)
+    output_tok = usage.get("completion_tokens", 0)
+
+    prices = MODEL_PRICES_MTOK.get(model_key)
+    return (input_tok / 1e6) * prices["input"] + \
+           (output_tok / 1e6) * prices["output"]
+
+
 def call_openrouter_connect_four(model_key, system_prompt, prompt):
     """
     Call the LLM and return the response.
@@ -26,40 +285,25 @@ def call_openrouter_connect_four(model_key, system_prompt, prompt):
     - system_prompt: llm system prompt
     - prompt: user prompt with current state of the game
     """
-    
-    model = OPENROUTER_MODELS[model_key]
-  
-    headers={
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost",  
-        "X-Title": "My Local Test", 
-  }
-
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ]
-    }
-
-    response = requests.post(
-        url="https://openrouter.ai/api/v1/chat/completions",
-        headers=headers,
-        json=payload,
-        timeout=60
-    )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
 
-    response.raise_for_status()
-    return response.json()
+    return get_client().chat(model_key, messages)
 
 
-def get_llm_move(model_key, state):
+def get_llm_move(model_key, state, use_cache=True):
     """
     Given the current state of game, invoke the lmm and return the best move in connect four, along with other additional info.
+    The responses are stored in the cache (see get_cache): a position already queried with the same model
+    is answered by the cache, without cost. Only the responses with a parsable move are cached.
+    The result reports time (seconds spent by this call, i.e. the cache read for a hit) and latency
+    (seconds of the request to the LLM, None for a cache hit).
     - model_key: key to the model to invoke (OPENROUTER_MODELS)
     - state: current state of the game
+    - use_cache: False to always query the LLM (e.g. when the cached answer was an illegal move),
+                 the new response replaces the cached one
     """
     
     system_prompt = (
@@ -75,33 +319,254 @@ def get_llm_move(model_key, state):
     
     query = f"Current board state:\n{state.board}\nYour turn to play as '{state.to_play}'."
 
+    cache = get_cache()
+    key = LLMCache.key(OPENROUTER_MODELS[model_key], system_prompt, query)
+
     start = time.perf_counter()
-    data = call_openrouter_connect_four(model_key, system_prompt, query)
+    entry = cache.get(key) if cache is not None and use_cache else None
+
+    if entry is not None:
+        data = entry["response"]
+        cost = 0
+    else:
+        data = call_openrouter_connect_four(model_key, system_prompt, query)
+        cost = llm_cost(model_key, data)
     end = time.perf_counter()
 
     raw = data["choices"][0]["message"]["content"]
     #print(raw)
     parsed = robust_json_parse(raw)
 
-    usage = data.get("usage", {})
-    input_tok = usage.get("prompt_tokens", 0)
-    output_tok = usage.get("completion_tokens", 0)
     reason = parsed.get("reason", "")
-    column = int(parsed.get("column"))
+    column = int(parsed["column"])
 
-    prices = MODEL_PRICES_MTOK.get(model_key)
-    cost = (input_tok / 1e6) * prices["input"] + \
-           (output_tok / 1e6) * prices["output"]
+    # cached only once parsed, so that a malformed answer is asked again instead of being replayed from the cache
+    if entry is None and cache is not None:
+        cache.put(key, data, cost, end - start)
 
     return {
         "column": column,
         "reason": reason,
         "cost": cost,
         "raw_response": raw,
-        "time": end - start
+        "time": end - start,
+        "latency": end - start if entry is None else None,
+        "cache_hit": entry is not None
     }
 
 
+async def get_llm_move_async(model_key, state, use_cache=True):
+    """
+    Asyncio variant of get_llm_move, to play many games concurrently.
+    The state must not change until the move is returned.
+    """
+    return await asyncio.to_thread(get_llm_move, model_key, state, use_cache)
+
+
+def percentile(values, p):
+    """Return the p-th percentile (nearest rank) of the values, None if there are no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class LLMMoveRequester:
+    """
+    Resilient requests of the LLM moves (see get_llm_move): failed requests and illegal moves are retried with
+    exponential backoff within a total time budget per move, and a request slower than the hedge_percentile of
+    the past request latencies is hedged with a duplicate request, taking the first answer.
+    When the budget is exhausted the move is chosen by a local engine (fallback).
+    The cost of every request is accounted in total_cost, including the hedges which lost the race.
+    """
+
+    def __init__(self, model_key, fallback=None, time_budget=120, base_backoff=0.5, max_backoff=8,
+                 hedge_percentile=90, min_hedge_samples=5):
+        """
+        - model_key: key to the model to invoke (OPENROUTER_MODELS)
+        - fallback: function returning the move of a local engine for a state (None for the most central legal column)
+        - time_budget: max seconds to get a legal move from the LLM
+        - base_backoff, max_backoff: first and max wait between two attempts, in seconds (doubled at each attempt)
+        - hedge_percentile: percentile of the past request latencies after which a duplicate request is sent
+        - min_hedge_samples: number of latencies needed before hedging
+        """
+        self.model_key = model_key
+        self.fallback = fallback
+        self.time_budget = time_budget
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_samples = min_hedge_samples
+
+        # requests still running after their move was decided are abandoned in the pool
+        self.executor = ThreadPoolExecutor(max_workers=8)
+
+        self.request_latencies = []    # latency of each answered request to the LLM (cache misses)
+        self.cache_hit_latencies = []  # time of each request answered by the cache, kept out of the hedge delay
+        self.move_latencies = []     # time to decide each move, with retries, hedging and fallback
+        self.hedged_requests = 0
+        self.fallback_moves = 0
+
+        # cost of all the answered requests, added when each request completes (also after its move was decided)
+        self.total_cost = 0
+        self.cost_lock = threading.Lock()
+
+
+    def submit(self, state, use_cache):
+        """Submit a request of the move of the state to the pool, accounting its cost in total_cost when it completes."""
+        future = self.executor.submit(get_llm_move, self.model_key, state, use_cache)
+        future.add_done_callback(self.add_cost)
+        return future
+
+
+    def add_cost(self, future):
+        """Done callback of the requests: add the cost of the answered request to total_cost."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self.cost_lock:
+            self.total_cost += future.result()["cost"]
+
+
+    def hedge_delay(self):
+        """Seconds after which a request is hedged, None until enough latencies are recorded."""
+        if len(self.request_latencies) < self.min_hedge_samples:
+            return None
+        return percentile(self.request_latencies, self.hedge_percentile)
+
+
+    def hedged_request(self, state, timeout, use_cache):
+        """
+        Request the move of the state, sending a duplicate request if the first one takes longer than hedge_delay.
+        Returns the first successful answer, raises the error of the requests if all fail or TimeoutError.
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+
+        pending = {self.submit(state, use_cache)}
+        hedge_delay = self.hedge_delay()
+        error = None
+
+        while pending:
+
+            # wait for the first answer, until it is time to hedge or the deadline
+            wait_until = deadline
+            hedge = hedge_delay is not None and len(pending) == 1 and start + hedge_delay < deadline
+            if hedge:
+                wait_until = start + hedge_delay
+
+            done, pending = wait(pending, timeout=max(0, wait_until - time.perf_counter()), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if result["cache_hit"]:
+                    self.cache_hit_latencies.append(result["time"])
+                else:
+                    self.request_latencies.append(result["latency"])
+                return result
+
+            if not done:
+                if not hedge:
+                    raise TimeoutError(f"No answer from the LLM in {timeout:.1f}s")
+
+                # the duplicate request skips the cache: the first request has already missed it
+                pending.add(self.submit(state, False))
+                hedge_delay = None
+                self.hedged_requests += 1
+
+        raise error
+
+
+    def get_move(self, state):
+        """
+        Return a legal move of the LLM for the state, with the info of get_llm_move and:
+        attempts (requests sent), invalid (illegal moves proposed), fallback (the move was chosen by the local engine),
+        cost (of the answered attempts, see total_cost for the hedges which lost), cache_hits and cache_misses (of the answered attempts), time (to decide the move).
+        - state: current state of the game, not modified
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+
+        # the requests may outlive the move, so they read a copy of the state
+        snapshot = copy.deepcopy(state)
+        legal_moves = state.available_moves()
+
+        attempts, answered, invalid, cost, cache_hits = 0, 0, 0, 0, 0
+        use_cache = True
+        move_data = None
+
+        while time.perf_counter() < deadline:
+
+            if attempts > 0:
+                # exponential backoff with jitter, without exceeding the budget
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1)
+                time.sleep(max(0, min(backoff, deadline - time.perf_counter())))
+                if time.perf_counter() >= deadline:
+                    break
+
+            attempts += 1
+            try:
+                result = self.hedged_request(snapshot, deadline - time.perf_counter(), use_cache)
+            except Exception as e:
+                print(f"Error during the LLM call: {e}, retrying...")
+                use_cache = False
+                continue
+
+            answered += 1
+            cost += result["cost"]
+            cache_hits += result["cache_hit"]
+
+            if result["column"] in legal_moves:
+                move_data = result
+                break
+
+            invalid += 1
+            print(f"LLM proposed illegal move: {result['column']}, retrying...")
+            # the retries always query the LLM, the cached answer would be the same
+            use_cache = False
+
+        fallback = move_data is None
+        if fallback:
+            self.fallback_moves += 1
+            print(f"No legal move from the LLM in {self.time_budget}s, falling back to the local engine")
+            column = self.fallback(state) if self.fallback is not None else \
+                     min(legal_moves, key=lambda move: abs(move - state.columns // 2))
+            move_data = {"column": column, "reason": "fallback", "raw_response": None}
+
+        end = time.perf_counter()
+        self.move_latencies.append(end - start)
+
+        move_data.update({
+            "attempts": attempts,
+            "invalid": invalid,
+            "fallback": fallback,
+            "cost": cost,
+            "cache_hits": cache_hits,
+            "cache_misses": answered - cache_hits,
+            "time": end - start
+        })
+        return move_data
+
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """Return the percentiles of the move latencies, of the request latencies and of the cache hits, in seconds."""
+        return {
+            "move": {p: percentile(self.move_latencies, p) for p in percentiles},
+            "request": {p: percentile(self.request_latencies, p) for p in percentiles},
+            "cache_hit": {p: percentile(self.cache_hit_latencies, p) for p in percentiles}
+        }
+
+
+    def close(self):
+        """
+        Shut down the pool without waiting for the abandoned requests: the queued ones are cancelled, while the ones
+        already running cannot be interrupted and complete in the background (their cost is still added to total_cost).
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
 
 def call_openrouter_knapsack(model_key, prompt):
     """
@@ -109,41 +574,20 @@ def call_openrouter_knapsack(model_key, prompt):
     - model_key: key to the model to invoke (OPENROUTER_MODELS)
     - prompt: user prompt with data instance
     """
-
-    model = OPENROUTER_MODELS[model_key]
-
-    headers={
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "http://localhost", 
-        "X-Title": "My Local Test", 
-   }
-
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system",
-             "content": (
-                 "You are an expert in in combinatorial optimization. "
-                 "Solve the 0-1 knapsack problem exactly. "
-                 "Answer in the following structured format:\n"
-                 "{'solution': <integer>}\n"
-                 "Do Not add anything outside this structured format."
-                 "Think step-by-step BUT DO NOT PRINT your reasoning."
-             )},
-            {"role": "user", "content": prompt}
-        ]
-    }
-
-    response = requests.post(
-        url="https://openrouter.ai/api/v1/chat/completions",
-        headers=headers,
-        json=payload,
-        timeout=60
-    )
-
-    response.raise_for_status()
-    return response.json()
+    messages = [
+        {"role": "system",
+         "content": (
+             "You are an expert in in combinatorial optimization. "
+             "Solve the 0-1 knapsack problem exactly. "
+             "Answer in the following structured format:\n"
+             "{'solution': <integer>}\n"
+             "Do Not add anything outside this structured format."
+             "Think step-by-step BUT DO NOT PRINT your reasoning."
+         )},
+        {"role": "user", "content": prompt}
+    ]
+
+    return get_client().chat(model_key, messages)
 
 
 def get_gpt_knapsack_solution(model_key, items, capacity):
@@ -158,7 +602,7 @@ def get_gpt_knapsack_solution(model_key, items, capacity):
     query = f"Knapsack capacity: {capacity}\nItems:\n{items}."
     
     start = time.perf_counter()
-    data = call_openrouter_connect_four(model_key, query)
+    data = call_openrouter_knapsack(model_key, query)
     end = time.perf_counter()
 
     raw = data["choices"][0]["message"]["content"]
@@ -168,13 +612,7 @@ def get_gpt_knapsack_solution(model_key, items, capacity):
         print("RAW RESPONSE (truncated):", raw[:500])
         raise
 
-    usage = data.get("usage", {})
-    input_tok = usage.get("prompt_tokens", 0)
-    output_tok = usage.get("completion_tokens", 0)
-
-    prices = MODEL_PRICES_MTOK.get(model_key)
-    cost = (input_tok / 1e6) * prices["input"] + \
-           (output_tok / 1e6) * prices["output"]
+    cost = llm_cost(model_key, data)
 
     return {
         "solution": int(parsed["solution"]),
@@ -184,6 +622,15 @@ def get_gpt_knapsack_solution(model_key, items, capacity):
     }
 
 
+async def get_gpt_knapsack_solutions_async(model_key, items, capacity, num_runs):
+    """
+    Run num_runs independent knapsack queries concurrently, returning their results (see get_gpt_knapsack_solution).
+    A failed query is returned as its exception.
+    """
+    return await asyncio.gather(*(asyncio.to_thread(get_gpt_knapsack_solution, model_key, items, capacity)
+                                  for _ in range(num_runs)), return_exceptions=True)
+
+
 def robust_json_parse(text):
     """
     Parse the llm answer to extract info.
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connect_four import ConnectFour
+import llm
+
+# Quick checks of the LLM client, run as a script against a local stand-in of the chat completions API
+# (no API key or network needed): each check prints its result and an AssertionError stops the script at the first failure.
+
+
+class StandInServer:
+    """
+    Local stand-in of the chat completions API, answering each request with the next of the given answers
+    (the last one is repeated), after an optional delay.
+    It records the client address of each request, i.e. the connection it was sent on.
+    """
+
+    def __init__(self):
+        self.answers = []  # (content of the message, delay in seconds) of the next answers
+        self.requests = []  # client address of each request
+        self.lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive connections, as the real API
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with stand_in.lock:
+                    stand_in.requests.append(self.client_address)
+                    content, delay = stand_in.answers.pop(0) if len(stand_in.answers) > 1 else stand_in.answers[0]
+                time.sleep(delay)
+
+                body = json.dumps({
+                    "choices": [{"message": {"content": content}}],
+                    "usage": {"prompt_tokens": 1000, "completion_tokens": 100}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+    def answer(self, *answers):
+        """Set the next answers, each one a column (a legal move answer), a raw content string, or a (answer, delay) pair."""
+        self.answers = []
+        for answer in answers:
+            answer, delay = answer if isinstance(answer, tuple) else (answer, 0)
+            content = answer if isinstance(answer, str) else json.dumps({"column": answer, "reason": "stand-in"})
+            self.answers.append((content, delay))
+        self.requests.clear()
+
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check_client(server):
+    """The client sends the requests to the configured base URL, reusing its pooled connections."""
+    client = llm.LLMClient(base_url=server.base_url, api_key="test")
+    messages = [{"role": "user", "content": "move"}]
+
+    server.answer(3)
+    for _ in range(5):
+        data = client.chat("openai", messages)
+        assert json.loads(data["choices"][0]["message"]["content"])["column"] == 3
+    assert len(server.requests) == 5 and len(set(server.requests)) == 1, server.requests
+
+    # the asyncio variant sends the requests concurrently, each one on its own connection of the pool
+    async def chat_many(num_requests):
+        return await asyncio.gather(*(client.chat_async("openai", messages) for _ in range(num_requests)))
+
+    server.answer((3, 0.3))
+    start = time.perf_counter()
+    asyncio.run(chat_many(4))
+    assert time.perf_counter() - start < 1.0 and len(server.requests) == 4
+
+    cost = llm.llm_cost("openai", data)
+    assert abs(cost - (1000 * 1.10 + 100 * 4.40) / 1e6) < 1e-12, cost
+
+    client.close()
+    print(f"LLM client (base URL, {len(set(server.requests))} pooled connections for 4 concurrent requests): OK")
+
+
+def check_cache(server):
+    """
+    The cache answers the positions already queried without cost, expires and evicts its entries,
+    and doesn't store the answers without a parsable move.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = llm.LLMCache(cache_dir, ttl=60, max_bytes=None)
+        llm.default_cache = cache
+        game = ConnectFour()
+
+        # a malformed answer raises and is not cached: the next call asks the LLM again
+        server.answer("no move here", 3)
+        try:
+            llm.get_llm_move("openai", game)
+        except Exception:
+            pass
+        else:
+            raise AssertionError("malformed answer accepted")
+
+        first = llm.get_llm_move("openai", game)
+        second = llm.get_llm_move("openai", game)
+        assert len(server.requests) == 2 and not first["cache_hit"] and second["cache_hit"]
+        assert second["column"] == first["column"] == 3 and second["cost"] == 0 and second["latency"] is None
+        assert cache.hits == 1 and cache.saved_cost == first["cost"] > 0
+
+        # use_cache=False asks the LLM and replaces the cached answer
+        server.answer(4)
+        assert llm.get_llm_move("openai", game, use_cache=False)["column"] == 4
+        assert llm.get_llm_move("openai", game)["column"] == 4 and len(server.requests) == 1
+
+        # expired entries are misses, and are deleted
+        key = llm.LLMCache.key("model", "system", "prompt")
+        cache.put(key, {"choices": []}, 0.01, 1.0)
+        cache.ttl = 0
+        time.sleep(0.01)
+        assert cache.get(key) is None and not os.path.exists(cache.path(key))
+
+        # over max_bytes, the least recently used entries are evicted
+        cache = llm.LLMCache(os.path.join(cache_dir, "small"), max_bytes=None)
+        keys = [llm.LLMCache.key("model", "system", str(i)) for i in range(3)]
+        for key in keys:
+            cache.put(key, {"choices": []}, 0.01, 1.0)
+            time.sleep(0.01)
+        cache.get(keys[0])
+        # room for two entries (their size varies by a few bytes, with the time of creation)
+        cache.max_bytes = os.path.getsize(cache.path(keys[0])) + os.path.getsize(cache.path(keys[2])) + 16
+        cache.put(keys[0], {"choices": []}, 0.01, 1.0)
+        assert [os.path.exists(cache.path(key)) for key in keys] == [True, False, True]
+
+    llm.default_cache = None
+    print("LLM cache (hits without cost, expiration, eviction, malformed answers): OK")
+
+
+def check_requester(server):
+    """
+    The illegal moves are retried, the slow requests are hedged, the LLM is replaced by the fallback engine
+    when the time budget runs out, and the cost of every answered request is accounted.
+    """
+    game = ConnectFour()
+    request_cost = llm.llm_cost("openai", {"usage": {"prompt_tokens": 1000, "completion_tokens": 100}})
+    requester = llm.LLMMoveRequester("openai", fallback=lambda state: 6, time_budget=5, base_backoff=0.01,
+                                     min_hedge_samples=5)
+
+    # an illegal move is asked again
+    server.answer(9, 2)
+    move = requester.get_move(game)
+    assert (move["column"], move["attempts"], move["invalid"], move["fallback"]) == (2, 2, 1, False), move
+
+    # once the latencies are known, a request slower than them is hedged by a duplicate, which answers first
+    server.answer((3, 0.02))
+    for _ in range(4):
+        requester.get_move(game)
+    server.answer((1, 1.0), (5, 0.02))
+    start = time.perf_counter()
+    move = requester.get_move(game)
+    assert move["column"] == 5 and time.perf_counter() - start < 0.5 and requester.hedged_requests == 1, move
+
+    # no legal move within the budget: the fallback engine moves
+    requester.time_budget = 0.2
+    server.answer((3, 1.0))
+    move = requester.get_move(game)
+    assert move["fallback"] and move["column"] == 6 and requester.fallback_moves == 1, move
+
+    # the hedges which lost the race and the requests (and their hedge) abandoned for the fallback are paid as well
+    time.sleep(1.5)
+    assert abs(requester.total_cost - 10 * request_cost) < 1e-12, requester.total_cost / request_cost
+
+    requester.close()
+    print(f"LLM move requests (retries, hedging, fallback, {requester.total_cost / request_cost:.0f} requests paid): OK")
+
+
+if __name__ == "__main__":
+    server = StandInServer()
+    llm.default_client = llm.LLMClient(base_url=server.base_url, api_key="test")
+    llm.LLM_CACHE_DIR = ""  # no cache, unless a check sets llm.default_cache
+    try:
+        check_client(server)
+        check_cache(server)
+        check_requester(server)
+    finally:
+        server.close()
+    print("All checks passed")
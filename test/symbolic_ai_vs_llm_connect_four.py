@@ -2,13 +2,18 @@
 import time
 import sys
 import os
-from test.llm import get_llm_move
+from test.llm import LLMMoveRequester
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from connect_four import ConnectFour
 from minmax import MinMax
 from monte_carlo_tree_search import MCTS 
 
 
+# depth of the MinMax choosing the LLM move when the LLM doesn't answer with a legal move in time
+FALLBACK_DEPTH = 4
+LLM_MOVE_TIME_BUDGET = 120
+
+
 def run_game(symbolic_ai_type, llm, starter, time_MCTS=None, depth_alphabeta=None):
        
         game = ConnectFour()
@@ -23,6 +28,11 @@ def run_game(symbolic_ai_type, llm, starter, time_MCTS=None, depth_alphabeta=Non
                 
         invalid_gpt_moves = 0
         gpt_move_call_count = 0
+        fallback_moves = 0
+
+        requester = LLMMoveRequester(
+                llm, time_budget=LLM_MOVE_TIME_BUDGET,
+                fallback=lambda state: MinMax(state).get_best_move_alphabeta(FALLBACK_DEPTH, ai_player=llm_player, verbose=False))
 
         if starter == "S": 
                game.to_play = symbolic_ai_player 
@@ -30,6 +40,8 @@ def run_game(symbolic_ai_type, llm, starter, time_MCTS=None, depth_alphabeta=Non
                game.to_play = llm_player
 
         costs = []
+        cache_hits = 0
+        cache_misses = 0
         symbolic_ai_times = []
         llm_times = []
         count_plies = 0
@@ -77,31 +89,22 @@ def run_game(symbolic_ai_type, llm, starter, time_MCTS=None, depth_alphabeta=Non
                 # LLM turn
                 else:
                         print("\nLLM thinking...")
-                        while True:
-                                try:
-                                        start_time = time.perf_counter()
-                                        move_data = get_llm_move(llm, game)  
-                                        end_time = time.perf_counter()
-                                        llm_move = move_data["column"]
-                                        #llm_reason = move_data["reason"]
-                                        cost = move_data["cost"]
-                                        costs.append(cost)
-                                        gpt_move_call_count += 1
-
-                                        if llm_move in game.available_moves():
-                                                break
-                                        else:
-                                                invalid_gpt_moves += 1
-                                                print(f"LLM proposed illegal move: {llm_move}, retrying...")
-                                except Exception as e:
-                                        print(f"Errore nella chiamata LLM: {e}, retrying...")
-
-                
-                        print(f"LLM chooses column {llm_move}")
+                        move_data = requester.get_move(game)
+                        llm_move = move_data["column"]
+                        #llm_reason = move_data["reason"]
+                        cost = move_data["cost"]
+                        costs.append(cost)
+                        gpt_move_call_count += move_data["attempts"]
+                        invalid_gpt_moves += move_data["invalid"]
+                        fallback_moves += move_data["fallback"]
+                        cache_hits += move_data["cache_hits"]
+                        cache_misses += move_data["cache_misses"]
+
+                        print(f"LLM chooses column {llm_move}" + (" (fallback engine)" if move_data["fallback"] else ""))
                         #print(f"Reason: {llm_reason}")
-                        print(f"LLM reasoned {(end_time-start_time):.4f}s")
+                        print(f"LLM reasoned {move_data['time']:.4f}s")
                         print(f"Cost: {cost}")
-                        llm_times.append(end_time-start_time)
+                        llm_times.append(move_data["time"])
 
                         if symbolic_ai_type == 1:
                                 mcts.move(llm_move)  
@@ -124,16 +127,23 @@ def run_game(symbolic_ai_type, llm, starter, time_MCTS=None, depth_alphabeta=Non
                 winner_str = "tie"
                 print("\nTie!\n")
 
-        total_cost_llm = sum(costs) 
-        avg_cost_llm = sum(costs)/len(costs)
+        # cost of all the requests, with the hedges which lost the race
+        total_cost_llm = requester.total_cost
+        avg_cost_llm = total_cost_llm/len(costs)
         total_time_llm = sum(llm_times)
         avg_time_llm = sum(llm_times)/len(llm_times)
 
         total_time_symbolic_ai = sum(symbolic_ai_times)
         avg_time_symbolic_ai = sum(symbolic_ai_times)/len(symbolic_ai_times)
 
+        requester.close()
+        latency = requester.latency_percentiles()
+
         print("Invalid GPT moves:", invalid_gpt_moves)
+        print(f"Fallback moves: {fallback_moves}. Hedged requests: {requester.hedged_requests}")
+        print("LLM move latency: " + ", ".join(f"p{p} {t:.2f}s" for p, t in latency["move"].items() if t is not None))
         print(f"Total cost: {total_cost_llm:.4f}$. Avg cost: {avg_cost_llm:.4f}$")
+        print(f"LLM cache: {cache_hits} hits, {cache_misses} misses")
         print(f"Total time llm: {total_time_llm:.4f}s. Avg time: {avg_time_llm:.4f}s")
         print(f"Total time {symbolic_ai}: {total_time_symbolic_ai:.4f}s. Avg time: {avg_time_symbolic_ai:.4f}s")
         print(f"Number of plies: {count_plies}")
@@ -141,7 +151,11 @@ def run_game(symbolic_ai_type, llm, starter, time_MCTS=None, depth_alphabeta=Non
         result = {
                 "winner": winner_str,
                 "invalid_gpt_moves": invalid_gpt_moves,
+                "fallback_moves": fallback_moves,
+                "llm_latency_percentiles": latency,
                 "total_cost": total_cost_llm,
+                "cache_hits": cache_hits,
+                "cache_misses": cache_misses,
                 "avg_cost": avg_cost_llm,
                 "total_llm_time": total_time_llm,
                 "avg_llm_time": avg_time_llm,
@@ -245,6 +259,9 @@ def run_experiments():
         avg_symbolic_time_per_move = sum(all_symbolic_times) / len(all_symbolic_times)
 
         total_invalid_moves = sum(r["invalid_gpt_moves"] for r in results)
+        total_cache_hits = sum(r["cache_hits"] for r in results)
+        total_cache_misses = sum(r["cache_misses"] for r in results)
+        total_fallback_moves = sum(r["fallback_moves"] for r in results)
         avg_plies = sum(r["count_plies"] for r in results) / len(results)
    
         print(f"Symbolic AI  ({symbolic_ai}) wins: {wins_symbolic}/{n} ({wins_symbolic/n*100:.1f}%)")
@@ -256,9 +273,11 @@ def run_experiments():
 
         print(f"\nAverage LLM cost per game: {avg_cost_game:.4f}$")
         print(f"Average LLM cost per move: {avg_cost_move:.4f}$")
+        print(f"LLM cache: {total_cache_hits} hits, {total_cache_misses} misses")
 
         print(f"\nAverage number of plies per game: {avg_plies:.2f}")
         print(f"Total invalid LLM moves across all games: {total_invalid_moves}")
+        print(f"Total fallback moves across all games: {total_fallback_moves}")
 
 
 run_experiments()
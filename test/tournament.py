@@ -0,0 +1,337 @@
+import json
+import os
+import random
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connect_four import ConnectFour
+from minmax import MinMax
+from monte_carlo_tree_search import MCTS
+from transposition_table import TranspositionTable
+
+# Parallel tournament runner for engine-vs-engine Connect Four matches.
+# A player is described by a dict:
+# - {"engine": "minmax", "depth": 6, "heuristic": True}  ("tt": True to keep a transposition table across its games)
+# - {"engine": "mcts", "time_limit": 10}  or  {"engine": "mcts", "rollouts": 5000}
+#   ("symmetry": True to share the statistics of mirrored positions, see monte_carlo_tree_search.SharedNode)
+# ("threats": True to run the threat analysis of ConnectFour before searching, for both engines;
+#  "threat_extension": 4 to search up to 4 plies beyond the depth of MinMax along the forcing moves)
+# Each game runs in a worker process with its own seed, without printing the board,
+# and its record is appended to a JSONL results store as soon as it finishes.
+# Each MinMax player with a transposition table has its own table in shared memory, used by all the workers,
+# so that the positions searched in a game start warm in the next ones.
+
+# transposition tables of the players in the current process, by player name
+TABLES = {}
+
+
+class MinMaxEngine:
+    """MinMax alpha-beta player, searching from scratch at each move."""
+
+    def __init__(self, spec, game, player):
+        self.depth = spec["depth"]
+        self.heuristic = spec.get("heuristic", True)
+        self.player = player
+        self.threats = spec.get("threats", False)
+        self.threat_extension = spec.get("threat_extension", 0)
+        self.table = None
+
+        if spec.get("tt"):
+            # table of the tournament if attached by the worker, otherwise one for this process
+            name = player_name(spec)
+            if name not in TABLES:
+                TABLES[name] = TranspositionTable()
+            self.table = TABLES[name]
+
+
+    def choose(self, game):
+        minmax = MinMax(game, transposition_table=self.table)
+        return minmax.get_best_move_alphabeta(self.depth, ai_player=self.player, heuristic=self.heuristic,
+                                              verbose=False, threats=self.threats, threat_extension=self.threat_extension)
+
+
+    def observe(self, move):
+        pass
+
+
+class MCTSEngine:
+    """MCTS player, with its own copy of the game so that its tree follows all the moves of the match."""
+
+    def __init__(self, spec, game, player):
+        self.time_limit = spec.get("time_limit")
+        self.rollouts = spec.get("rollouts")
+        self.mcts = MCTS(deepcopy(game), ai_player=player, symmetry=spec.get("symmetry", False),
+                         threats=spec.get("threats", False))
+
+
+    def choose(self, game):
+        if self.rollouts is not None:
+            self.mcts.search_max_rollout(self.rollouts)
+        else:
+            self.mcts.search_max_time(self.time_limit)
+        return self.mcts.best_move()
+
+
+    def observe(self, move):
+        self.mcts.move(move)
+
+
+ENGINES = {"minmax": MinMaxEngine, "mcts": MCTSEngine}
+
+
+def player_name(spec):
+    """Short name of a player, e.g. minmax(d=6) or mcts(t=10)."""
+    threats = ", threats" if spec.get("threats") else ""
+    if spec["engine"] == "minmax":
+        extension = f", ext={spec['threat_extension']}" if spec.get("threat_extension") else ""
+        return (f"minmax(d={spec['depth']}{'' if spec.get('heuristic', True) else ', no heuristic'}"
+                f"{', tt' if spec.get('tt') else ''}{threats}{extension})")
+    symmetry = ", symmetry" if spec.get("symmetry") else ""
+    if spec.get("rollouts") is not None:
+        return f"mcts(r={spec['rollouts']}{symmetry}{threats})"
+    return f"mcts(t={spec['time_limit']}{symmetry}{threats})"
+
+
+def game_seed(base_seed, config_key, game_index):
+    """Deterministic seed of a single game, derived from the base seed, the pairing and the game index."""
+    return zlib.crc32(f"{base_seed}|{config_key}|{game_index}".encode())
+
+
+def play_game(player_one, player_two, one_starts, seed):
+    """
+    Play a single game between two players inside a worker process, without printing, returning its record.
+    The players use the random generator seeded with seed, so games with rollout/depth budgets are reproducible
+    (with time budgets the number of rollouts depends on the machine).
+    - player_one, player_two: specs of the players, player_one plays as game.player1
+    - one_starts: True if player_one moves first
+    - seed: seed of the game
+    """
+    random.seed(seed)
+
+    game = ConnectFour()
+    game.to_play = game.player1 if one_starts else game.player2
+
+    engines = {
+        game.player1: ENGINES[player_one["engine"]](player_one, game, game.player1),
+        game.player2: ENGINES[player_two["engine"]](player_two, game, game.player2)
+    }
+    move_times = {game.player1: [], game.player2: []}
+    moves = []
+
+    while not game.game_over():
+        player = game.to_play
+
+        start = time.perf_counter()
+        move = engines[player].choose(game)
+        move_times[player].append(time.perf_counter() - start)
+
+        game.make_move(move, player)
+        moves.append(move)
+        for engine in engines.values():
+            engine.observe(move)
+
+    winner = game.check_winner()
+
+    return {
+        "winner": "one" if winner == game.player1 else "two" if winner == game.player2 else "draw",
+        "one_starts": one_starts,
+        "plies": len(moves),
+        "moves": moves,
+        "move_times_one": move_times[game.player1],
+        "move_times_two": move_times[game.player2]
+    }
+
+
+def run_game(config, game_index, seed):
+    """Play a game of a pairing in a worker process, returning its record for the results store."""
+    one_starts = game_index % 2 == 0  # alternate who starts
+    record = play_game(config["player_one"], config["player_two"], one_starts, seed)
+    record.update({"config": config["config"], "game": game_index, "seed": seed})
+    return record
+
+
+def build_pairing(player_one, player_two):
+    """Build the configuration of a pairing between two players."""
+    return {
+        "config": f"{player_name(player_one)} vs {player_name(player_two)}",
+        "player_one": player_one,
+        "player_two": player_two
+    }
+
+
+def run_settings(base_seed, tables_dir, table_entries):
+    """
+    Settings shared by all the games of a tournament, stored in each record: a game is reused on resume only if it was
+    played with the same base seed and the same transposition tables.
+    """
+    # round trip through JSON, so that the settings compare equal to the ones read back from the store
+    return json.loads(json.dumps({"base_seed": base_seed, "tables_dir": tables_dir, "table_entries": table_entries}))
+
+
+def load_results(results_path, settings=None):
+    """
+    Load the games already played from the results store (JSON lines), keyed by (config, game).
+    A truncated last line, left by an interrupted tournament, is ignored.
+    - settings: settings of the tournament (see run_settings): the records of games played with different settings
+                are stale and ignored (None to load all the records)
+    """
+    results = {}
+
+    if not os.path.exists(results_path):
+        return results
+
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if settings is not None and record.get("settings") != settings:
+                continue
+            results[(record["config"], record["game"])] = record
+
+    return results
+
+
+def attach_tables(table_names):
+    """Initializer of the worker processes: attach to the shared transposition tables of the players."""
+    for name, shm_name in table_names.items():
+        TABLES[name] = TranspositionTable.attach(shm_name)
+
+
+def table_path(tables_dir, name):
+    """File of the transposition table of a player, saved between tournaments."""
+    return os.path.join(tables_dir, "".join(c if c.isalnum() else "_" for c in name) + ".tt")
+
+
+def run_tournament(configs, num_games, results_path, base_seed=0, max_workers=None, on_result=None,
+                   tables_dir=None, table_entries=1 << 18):
+    """
+    Play num_games games of each pairing over a process pool, appending each finished game to the results store,
+    so that an interrupted tournament resumes from the missing games. The games of the store played with other
+    settings (base seed or transposition tables) are played again. Returns all the records of the store with the
+    current settings.
+    - configs: pairings of the tournament (see build_pairing)
+    - num_games: number of games of each pairing
+    - results_path: path of the results store (JSON lines)
+    - base_seed: base seed from which the seed of each game is derived
+    - max_workers: number of worker processes (None to use all the cores)
+    - on_result: function called with each new record, e.g. to report the progress
+    - tables_dir: directory where the transposition tables of the players are loaded from and saved to (None to start them empty)
+    - table_entries: number of entries of each transposition table
+    """
+    settings = run_settings(base_seed, tables_dir, table_entries)
+    results = load_results(results_path, settings)
+
+    pending = [(config, game_index) for config in configs for game_index in range(num_games)
+               if (config["config"], game_index) not in results]
+
+    # terminate the truncated last line of an interrupted tournament, so that the new records start on their own line
+    if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+        with open(results_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            truncated = f.read(1) != b"\n"
+        if truncated:
+            with open(results_path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    # a shared transposition table for each MinMax player which uses one
+    players = [config[key] for config in configs for key in ("player_one", "player_two")]
+    tables = {player_name(player): None for player in players if player["engine"] == "minmax" and player.get("tt")}
+    for name in tables:
+        tables[name] = TranspositionTable.shared(table_entries, table_path(tables_dir, name) if tables_dir else None)
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=attach_tables,
+                                 initargs=({name: table.name for name, table in tables.items()},)) as executor, \
+                open(results_path, "a", encoding="utf-8") as store:
+
+            futures = [executor.submit(run_game, config, game_index, game_seed(base_seed, config["config"], game_index))
+                       for config, game_index in pending]
+
+            for future in as_completed(futures):
+                record = future.result()
+                record["settings"] = settings
+                results[(record["config"], record["game"])] = record
+
+                store.write(json.dumps(record) + "\n")
+                store.flush()
+
+                if on_result is not None:
+                    on_result(record)
+
+    finally:
+        # the tables are saved also when the tournament is interrupted, like the results store
+        for name, table in tables.items():
+            if tables_dir:
+                os.makedirs(tables_dir, exist_ok=True)
+                table.save(table_path(tables_dir, name))
+            table.close()
+            table.unlink()
+
+    return results
+
+
+def summarize_tournament(results, configs):
+    """
+    Aggregate the games of each pairing: wins of each player, draws, average plies and average time per move
+    of each player. Returns a dict keyed by pairing.
+    """
+    summary = {}
+
+    for config in configs:
+        records = [record for (key, _), record in sorted(results.items()) if key == config["config"]]
+        if not records:
+            continue
+
+        times_one = [t for record in records for t in record["move_times_one"]]
+        times_two = [t for record in records for t in record["move_times_two"]]
+
+        summary[config["config"]] = {
+            "games": len(records),
+            "wins_one": sum(record["winner"] == "one" for record in records),
+            "wins_two": sum(record["winner"] == "two" for record in records),
+            "draws": sum(record["winner"] == "draw" for record in records),
+            "avg_plies": sum(record["plies"] for record in records) / len(records),
+            "avg_move_time_one": sum(times_one) / len(times_one) if times_one else 0,
+            "avg_move_time_two": sum(times_two) / len(times_two) if times_two else 0,
+            "max_move_time_one": max(times_one, default=0),
+            "max_move_time_two": max(times_two, default=0)
+        }
+
+    return summary
+
+
+if __name__ == "__main__":
+
+    # MCTS with different time budgets against MinMax with different depths (see mcts_vs_minimax.py)
+    TIME_LIMITS = [1, 5]
+    DEPTHS = [4, 6]
+    NUM_GAMES = 10
+    RESULTS_PATH = "tournament_results.jsonl"  # delete it to start a new tournament from scratch
+
+    configs = [build_pairing({"engine": "mcts", "time_limit": time_limit}, {"engine": "minmax", "depth": depth})
+               for depth in DEPTHS for time_limit in TIME_LIMITS]
+
+    progress = {"done": 0}
+
+    def report(record):
+        progress["done"] += 1
+        print(f"[{progress['done']}] {record['config']} game {record['game']}: winner {record['winner']} "
+              f"in {record['plies']} plies")
+
+    results = run_tournament(configs, NUM_GAMES, RESULTS_PATH, on_result=report)
+
+    print("\n==================== Final Statistics ====================")
+
+    for config_key, s in summarize_tournament(results, configs).items():
+        print(f"\n{config_key} ({s['games']} games)")
+        print(f"  Wins player one: {s['wins_one']} ({s['wins_one'] / s['games'] * 100:.1f}%)")
+        print(f"  Wins player two: {s['wins_two']} ({s['wins_two'] / s['games'] * 100:.1f}%)")
+        print(f"  Draws:           {s['draws']} ({s['draws'] / s['games'] * 100:.1f}%)")
+        print(f"  Average plies:   {s['avg_plies']:.2f}")
+        print(f"  Avg time per move: {s['avg_move_time_one']:.3f}s / {s['avg_move_time_two']:.3f}s "
+              f"(max {s['max_move_time_one']:.3f}s / {s['max_move_time_two']:.3f}s)")
@@ -0,0 +1,81 @@
+import math
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from elo_rating import bradley_terry, elo_to_score, match_elo, run_sprt, sprt_llr
+from tournament import build_pairing, load_results, run_settings, run_tournament, summarize_tournament
+
+# Quick checks of the tournament runner and of the ratings, run as a script:
+# each check prints its result and an AssertionError stops the script at the first failure.
+
+PAIRING = build_pairing({"engine": "minmax", "depth": 1}, {"engine": "mcts", "rollouts": 50})
+
+
+def check_tournament_resume():
+    """
+    The games are reproducible from their seeds, a resumed tournament plays only the missing games,
+    and the games stored with other settings are played again.
+    """
+    with tempfile.TemporaryDirectory() as results_dir:
+        results_path = os.path.join(results_dir, "results.jsonl")
+
+        played = []
+        results = run_tournament([PAIRING], 2, results_path, base_seed=1, max_workers=1, on_result=played.append)
+        assert len(results) == len(played) == 2
+
+        # same settings: nothing to play, the stored games are returned
+        played.clear()
+        resumed = run_tournament([PAIRING], 3, results_path, base_seed=1, max_workers=1, on_result=played.append)
+        assert [record["game"] for record in played] == [2], played
+        assert all(resumed[key]["moves"] == results[key]["moves"] for key in results)
+
+        # another base seed: the stored games are stale
+        played.clear()
+        run_tournament([PAIRING], 3, results_path, base_seed=2, max_workers=1, on_result=played.append)
+        assert len(played) == 3, played
+        for base_seed in (1, 2):
+            assert len(load_results(results_path, run_settings(base_seed, None, 1 << 18))) == 3
+
+        # the games with the same seed are replayed the same
+        replayed = run_tournament([PAIRING], 2, os.path.join(results_dir, "replay.jsonl"), base_seed=1, max_workers=1)
+        assert all(replayed[key]["moves"] == results[key]["moves"] for key in replayed)
+
+        summary = summarize_tournament(resumed, [PAIRING])[PAIRING["config"]]
+        assert summary["games"] == 3 and summary["wins_one"] + summary["wins_two"] + summary["draws"] == 3
+
+    print("Tournament (reproducible games, resume, stale settings): OK")
+
+
+def check_rating():
+    """
+    The Elo interval of a match is never a point, the SPRT uses the observed variance of the score (a fallback
+    only when it is 0), and it stops a lopsided match early.
+    """
+    elo, elo_low, elo_high = match_elo(10, 0, 0)
+    assert elo_low < elo and 100 < elo_low < 300, (elo, elo_low, elo_high)
+    elo, elo_low, elo_high = match_elo(0, 10, 0)
+    assert elo_low < elo == 0 < elo_high, (elo, elo_low, elo_high)
+
+    # 6 wins, 2 draws and 2 losses: mean score 0.7, variance 0.16
+    score0, score1 = elo_to_score(0), elo_to_score(50)
+    expected = 10 * (score1 - score0) * (2 * 0.7 - score0 - score1) / (2 * 0.16)
+    assert math.isclose(sprt_llr(6, 2, 2, 0, 50), expected), sprt_llr(6, 2, 2, 0, 50)
+    assert 0 < sprt_llr(10, 0, 0, 0, 50) < math.inf and sprt_llr(0, 0, 10, 0, 50) < 0
+
+    # the ratings of a round robin follow the results
+    ratings = bradley_terry(["a", "b", "c"], [("a", "b", "one")] * 3 + [("b", "c", "one")] * 3 + [("a", "c", "draw")])
+    assert ratings["a"][0] > ratings["b"][0] > ratings["c"][0], ratings
+
+    # MinMax at depth 1 wins every game against MCTS with 20 rollouts
+    result = run_sprt({"engine": "minmax", "depth": 1}, {"engine": "mcts", "rollouts": 20}, max_games=200, max_workers=2)
+    assert result["decision"] == "H1" and result["games"] < 100, result
+    assert result["games"] == result["wins"] + result["draws"] + result["losses"]
+
+    print(f"Rating (Elo interval, SPRT decided after {result['games']} games): OK")
+
+
+if __name__ == "__main__":
+    check_tournament_resume()
+    check_rating()
+    print("All checks passed")
@@ -0,0 +1,201 @@
+import os
+import struct
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class TranspositionTable:
+    """
+    Transposition table of the alpha-beta search: for each position searched, its score, the depth of the search
+    (draft), the kind of bound of the score and the best move found.
+    The table is a fixed-size array of entries, indexed by the hash of the position key (an entry is replaced by the
+    positions that collide on it, unless it holds a deeper search of the same position), stored in one of:
+    - the memory of the process (default)
+    - a memory-mapped file, so that the table survives between runs (path)
+    - shared memory, so that the worker processes of a tournament share it (see shared and attach)
+
+    Each entry is made of three uint64 words: check, score (bits of the float64) and info (draft, bound, move).
+    check is the key xor the other two words: entries written concurrently by different processes without locks
+    can be torn, and a torn entry fails the check and is treated as missing.
+
+    The files of the table start with a header of the size of an entry: magic number, version of the file format and
+    version of the layout of the keys. A file with another header (e.g. written before a change of the keys of
+    MinMax.table_key) holds entries which would not match the current keys, so it is discarded instead of loaded.
+    """
+
+    EXACT = 0  # the score is exact
+    LOWER = 1  # the score is a lower bound (the search failed high: score >= beta)
+    UPPER = 2  # the score is an upper bound (the search failed low: score <= alpha)
+
+    ENTRY_WORDS = 3
+    ENTRY_BYTES = ENTRY_WORDS * 8
+
+    MAGIC = int.from_bytes(b"C4TTABLE", "little")
+    FORMAT_VERSION = 1
+    KEY_LAYOUT = 3  # version of the keys of MinMax.table_key (canonical position, player, heuristic, threat settings)
+    HEADER = (MAGIC, FORMAT_VERSION, KEY_LAYOUT)
+
+    def __init__(self, num_entries=1 << 18, path=None, shm=None):
+        """
+        - num_entries: number of entries of the table (ignored when the table is loaded from an existing file or shared memory)
+        - path: file of the table, memory-mapped (loaded if it exists with a valid header, created otherwise)
+        - shm: shared memory block of the table (see shared and attach)
+        """
+        self.path = path
+        self.shm = shm
+        self.file = None  # memory-mapped file of the table, with the header in its first entry
+
+        if shm is not None:
+            self.array = np.ndarray((shm.size // self.ENTRY_BYTES, self.ENTRY_WORDS), dtype=np.uint64, buffer=shm.buf)
+        elif path is not None:
+            if self.valid_file(path):
+                self.file = np.memmap(path, dtype=np.uint64, mode="r+").reshape(-1, self.ENTRY_WORDS)
+            else:
+                self.file = np.memmap(path, dtype=np.uint64, mode="w+", shape=(num_entries + 1, self.ENTRY_WORDS))
+                self.file[0] = self.HEADER
+            self.array = self.file[1:]
+        else:
+            self.array = np.zeros((num_entries, self.ENTRY_WORDS), dtype=np.uint64)
+
+        self.num_entries = len(self.array)
+
+        # flat view of the words as python ints: much faster than indexing the numpy array for single entries
+        self.words = memoryview(self.array.reshape(-1)).cast("B").cast("Q")
+
+        self.probes = 0  # number of lookups (of this process)
+        self.hits = 0  # number of lookups which found the position
+
+
+    @classmethod
+    def shared(cls, num_entries=1 << 18, path=None):
+        """
+        Create a table in a new shared memory block, initialized from the file path if it exists.
+        The worker processes attach to it by name (see attach); the creator has to unlink it when done.
+        """
+        shm = shared_memory.SharedMemory(create=True, size=num_entries * cls.ENTRY_BYTES)
+        table = cls(shm=shm)
+        table.array[:] = 0
+
+        if path is not None and cls.valid_file(path):
+            saved = np.fromfile(path, dtype=np.uint64, offset=cls.ENTRY_BYTES).reshape(-1, cls.ENTRY_WORDS)
+            if len(saved) == table.num_entries:
+                table.array[:] = saved
+
+        return table
+
+
+    @classmethod
+    def valid_file(cls, path):
+        """Check if the file exists and holds a table with the current header (format and layout of the keys)."""
+        if not os.path.exists(path):
+            return False
+
+        size = os.path.getsize(path)
+        if size < 2 * cls.ENTRY_BYTES or size % cls.ENTRY_BYTES != 0:
+            return False
+
+        return tuple(np.fromfile(path, dtype=np.uint64, count=cls.ENTRY_WORDS).tolist()) == cls.HEADER
+
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to the table in the shared memory block with the given name, created by another process."""
+        return cls(shm=shared_memory.SharedMemory(name=name))
+
+
+    @property
+    def name(self):
+        """Name of the shared memory block of the table (None if the table is not shared)."""
+        return self.shm.name if self.shm is not None else None
+
+
+    def __len__(self):
+        return self.num_entries
+
+
+    def slot(self, key):
+        """Index of the first word of the entry of the key (multiplicative hashing of the key)."""
+        return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) % self.num_entries * self.ENTRY_WORDS
+
+
+    def probe(self, key):
+        """
+        Look up a position, returning (score, draft, bound, move), None if the position is not in the table.
+        - key: key of the position (any non-negative integer of at most 64 bits)
+        """
+        self.probes += 1
+
+        i = self.slot(key)
+        check, score_bits, info = self.words[i], self.words[i + 1], self.words[i + 2]
+        if info == 0 or check ^ score_bits ^ info != key:
+            return None
+
+        self.hits += 1
+
+        score = struct.unpack("<d", struct.pack("<Q", score_bits))[0]
+        if score.is_integer():
+            score = int(score)
+        move = ((info >> 10) & 0xFF) - 1
+
+        return score, info & 0xFF, (info >> 8) & 0x3, move if move >= 0 else None
+
+
+    def store(self, key, score, draft, bound, move=None):
+        """
+        Store the result of the search of a position. The entry is kept if it holds a deeper search of the same position.
+        - key: key of the position
+        - score: score of the position
+        - draft: depth of the search below the position
+        - bound: EXACT, LOWER or UPPER
+        - move: best move found (None if unknown)
+        """
+        i = self.slot(key)
+        old_info = self.words[i + 2]
+        if old_info != 0 and self.words[i] ^ self.words[i + 1] ^ old_info == key and (old_info & 0xFF) > draft:
+            return
+
+        # bit 18 is always set, so an info of 0 marks an empty slot
+        info = min(draft, 0xFF) | (bound << 8) | ((move + 1 if move is not None else 0) << 10) | (1 << 18)
+        score_bits = struct.unpack("<Q", struct.pack("<d", score))[0]
+
+        self.words[i + 1] = score_bits
+        self.words[i + 2] = info
+        self.words[i] = key ^ score_bits ^ info
+
+
+    def hit_rate(self):
+        """Fraction of the lookups which found the position."""
+        return self.hits / self.probes if self.probes > 0 else 0.0
+
+
+    def clear(self):
+        """Remove all the entries."""
+        self.array[:] = 0
+
+
+    def flush(self):
+        """Write the table to its file (only for memory-mapped tables)."""
+        if self.file is not None:
+            self.file.flush()
+
+
+    def save(self, path):
+        """Write a copy of the table to a file, with its header, e.g. to reload a shared table in the next run."""
+        with open(path, "wb") as f:
+            np.array(self.HEADER, dtype=np.uint64).tofile(f)
+            np.ascontiguousarray(self.array).tofile(f)
+
+
+    def close(self):
+        """Release the table: flush the file or detach from the shared memory."""
+        self.flush()
+        if self.shm is not None:
+            self.words.release()
+            self.array = None
+            self.shm.close()
+
+
+    def unlink(self):
+        """Free the shared memory block (only by the process which created it, after all the processes closed it)."""
+        if self.shm is not None:
+            self.shm.unlink()